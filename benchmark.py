@@ -0,0 +1,606 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import asyncio
+import importlib.util
+import argparse
+import tempfile
+import threading
+import urllib.parse
+import http.server
+
+# 차트는 화면 없이 그리기
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import pystock
+
+# 벤치마크에 사용할 종목
+BENCH_STOCKS = [('삼성전자', '005930'), ('SK하이닉스', '000660'), ('NAVER', '035420'), ('카카오', '035720')]
+# 가짜 응답을 만들 일별 시세 페이지 수
+BENCH_PAGES = 60
+# 실제 서버 주소
+ORIGINS = ['https://finance.naver.com', 'https://kind.krx.co.kr']
+
+
+# ---------------------------------------------------------------------------
+# 가짜 응답 (네이버 금융 / KRX 형식의 HTML)
+# ---------------------------------------------------------------------------
+
+# 상장 종목 목록 (종목 수가 실제와 비슷하도록 임의의 회사명 추가)
+def fake_stock_list(count=2500):
+    rng = random.Random(0)
+    syllables = '가나다라마바사아자차카타파하전자화학제약바이오금융건설통신에너지'
+    rows = list(BENCH_STOCKS)
+    while len(rows) < count:
+        name = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 6)))
+        rows.append((name, f'{rng.randint(1000, 999999):06d}'))
+    trs = ''.join(f'<tr><td>{name}</td><td>유가증권</td><td>{code}</td><td>기타</td></tr>' for name, code in rows)
+    return f'<table><tr><th>회사명</th><th>시장구분</th><th>종목코드</th><th>업종</th></tr>{trs}</table>'
+
+# 시세 영역 (key : 'krx' 또는 'nxt')
+def fake_rate_info(key, price, rng):
+    return f'''<div class="rate_info" id="rate_info_{key}" style="display: block;">
+ <div class="today">
+  <p class="no_today"><em class="no_up"><span class="blind">{price:,}</span></em></p>
+  <p class="no_exday"><span class="sptxt sp_txt1">전일대비</span>
+   <em class="no_up"><span class="ico up">상승</span><span class="blind">{price // 100:,}</span></em>
+   <span class="parenthesis">(</span>
+   <em class="no_up"><span class="ico plus">+</span><span class="blind">1.01</span><span class="per">%</span></em>
+  </p>
+ </div>
+ <table class="no_info"><tr>
+  <td class="first"><span class="sptxt sp_txt2">전일</span><em><span class="blind">{price - price // 100:,}</span></em></td>
+  <td><span class="sptxt sp_txt4">고가</span><em class="no_up"><span class="blind">{price + 500:,}</span></em><span class="sptxt sp_txt5">(상한가)</span><em><span class="blind">{price * 13 // 10:,}</span></em></td>
+  <td><span class="sptxt sp_txt3">거래량</span><em><span class="blind">{rng.randint(10000, 9999999):,}</span></em></td>
+ </tr><tr>
+  <td class="first"><span class="sptxt sp_txt6">시가</span><em><span class="blind">{price - 300:,}</span></em></td>
+  <td><span class="sptxt sp_txt7">저가</span><em><span class="blind">{price - 900:,}</span></em><span class="sptxt sp_txt8">(하한가)</span><em><span class="blind">{price * 7 // 10:,}</span></em></td>
+  <td><span class="sptxt sp_txt10">거래대금</span><em><span class="blind">{rng.randint(1000, 999999):,}</span><span class="sptxt sp_txt11">백만</span></em></td>
+ </tr></table>
+</div>
+'''
+
+# 종목 현재 시세 페이지 (실제 페이지처럼 무거운 본문 포함, nxt=True면 NXT 시세 영역도 표시)
+def fake_main_page(code, nxt=False):
+    rng = random.Random(code)
+    price = rng.randint(10000, 900000)
+    filler = ''.join(
+        f'<div class="news"><a href="/news/{i}">뉴스 제목 {i}</a><p>본문 {"내용 " * 40}</p><span class="date">2025.01.01</span></div>'
+        for i in range(300)
+    )
+    return f'''<html><head><script>var data = "<div>";</script></head><body>
+<div id="header">{filler[:20000]}</div>
+{fake_rate_info('krx', price, rng)}{fake_rate_info('nxt', price + 100, rng) if nxt else ''}
+<div id="content">{filler}</div>
+<div class="aside_invest_info">
+ <div id="tab_con1" class="tab_con1">
+  <div class="first"><table summary="시가총액 정보">
+   <tr><th scope="row">시가총액</th><td><em id="_market_sum">
+		{rng.randint(1, 400)}조 {rng.randint(1000, 9999):,}</em>억원</td></tr>
+   <tr><th scope="row">외국인소진율(B/A) <a href="#"><img src="x.gif" alt=""></a></th><td><em>{rng.uniform(0, 80):.2f}%</em></td></tr>
+  </table></div>
+  <table class="per_table" summary="PER/EPS 정보">
+   <tr><th>PER <span>l</span> EPS</th><td><em id="_per">{rng.uniform(3, 40):.2f}</em>배 <span>l</span> <em id="_eps">{rng.randint(100, 20000):,}</em>원</td></tr>
+   <tr><th>추정PER <span>l</span> EPS</th><td><em id="_cns_per">{rng.uniform(3, 40):.2f}</em>배 <span>l</span> <em id="_cns_eps">{rng.randint(100, 20000):,}</em>원</td></tr>
+   <tr><th>PBR <span>l</span> BPS</th><td><em>{rng.uniform(0.3, 5):.2f}</em>배 <span>l</span> <em>{rng.randint(1000, 90000):,}</em>원</td></tr>
+   <tr><th>배당수익률</th><td><em>{rng.uniform(0, 6):.2f}</em>%</td></tr>
+  </table>
+  <table class="per_table" summary="동일업종 PER 정보"><tr><th>동일업종 PER</th><td><em>{rng.uniform(5, 30):.2f}</em>배</td></tr></table>
+ </div>
+</div>
+<div id="footer">{filler[:20000]}</div>
+</body></html>'''
+
+# 일별 시세 페이지 (한 페이지 10일, 최신순)
+def fake_price_page(code, page, days):
+    rng = random.Random(code)
+    start = rng.randint(10000, 900000)
+    last_page = (len(days) + 9) // 10
+    page = min(page, last_page)
+    trs = []
+    for i, day in enumerate(days[(page - 1) * 10 : page * 10]):
+        close = start + random.Random(code + day).randint(-1000, 1000) * 10
+        trs.append(
+            f'<tr><td align="center"><span class="tah p10 gray03">{day}</span></td>'
+            f'<td class="num"><span class="tah p11">{close:,}</span></td>'
+            f'<td class="num"><span class="tah p11 red02">상승 100</span></td>'
+            f'<td class="num"><span class="tah p11">{close - 100:,}</span></td>'
+            f'<td class="num"><span class="tah p11">{close + 500:,}</span></td>'
+            f'<td class="num"><span class="tah p11">{close - 500:,}</span></td>'
+            f'<td class="num"><span class="tah p11">{rng.randint(1000, 999999):,}</span></td></tr>'
+        )
+        if i == 4:
+            trs.append('<tr><td colspan="7" height="8"></td></tr>')
+    return f'''<html><body><table class="type2">
+<tr><th>날짜</th><th>종가</th><th>전일비</th><th>시가</th><th>고가</th><th>저가</th><th>거래량</th></tr>
+<tr><td colspan="7" height="8"></td></tr>{''.join(trs)}</table>
+<table class="Nnavi"><tr><td class="on"><a href="/item/sise_day.naver?code={code}&amp;page={page}">{page}</a></td>
+<td class="pgRR"><a href="/item/sise_day.naver?code={code}&amp;page={last_page}">맨뒤</a></td></tr></table></body></html>'''
+
+# 인기 종목 페이지
+def fake_popular_page(count=100):
+    rng = random.Random(1)
+    rows = []
+    for i in range(count):
+        name = BENCH_STOCKS[i % len(BENCH_STOCKS)][0] + (str(i) if i >= len(BENCH_STOCKS) else '')
+        up = rng.random() > 0.5
+        rows.append(
+            f'<tr><td class="no">{i + 1}</td><td><a href="/item/main.naver?code={i:06d}" class="tltle">{name}</a></td>'
+            f'<td class="number">{rng.randint(1000, 99999):,}</td>'
+            f'<td class="number"><em class="bu_p {"bu_pup" if up else "bu_pdn"}"><span class="blind">{"상승" if up else "하락"}</span></em>'
+            f'<span class="tah {"red02" if up else "nv01"}">{rng.randint(10, 999):,}</span></td>'
+            f'<td class="number"><span class="tah p11">{"+" if up else "-"}{rng.uniform(0, 30):.2f}%</span></td>'
+            f'<td class="number">{rng.randint(1000, 9999999):,}</td></tr>'
+        )
+    return f'''<html><body><table class="type_2">
+<tr><th>N</th><th>종목명</th><th>현재가</th><th>전일비</th><th>등락률</th><th>거래량</th></tr>
+<tr><td class="blank_08" colspan="6"></td></tr>{''.join(rows)}</table></body></html>'''
+
+# 가짜 응답 파일 생성 (주소 -> 파일 목록은 manifest.json)
+def generate_fixtures(path, pages=BENCH_PAGES):
+    os.makedirs(path, exist_ok=True)
+    manifest = {}
+
+    def add(url, text):
+        filename = f'{len(manifest):05d}.html'
+        with open(os.path.join(path, filename), 'w', encoding='utf-8') as f:
+            f.write(text)
+        manifest[request_key(url)] = {'file' : filename, 'content_type' : 'text/html; charset=utf-8'}
+
+    # 오늘부터 거꾸로 영업일 날짜
+    days, day = [], time.time()
+    while len(days) < pages * 10 + 5:
+        if time.localtime(day).tm_wday < 5:
+            days.append(time.strftime('%Y.%m.%d', time.localtime(day)))
+        day -= 24 * 60 * 60
+
+    add('https://kind.krx.co.kr/corpgeneral/corpList.do?method=download', fake_stock_list())
+    add('https://finance.naver.com/sise/nxt_sise_quant.naver', fake_popular_page())
+    for _, code in BENCH_STOCKS:
+        add(f'https://finance.naver.com/item/main.nhn?code={code}', fake_main_page(code))
+        for page in range(1, pages + 1):
+            add(f'https://finance.naver.com/item/sise_day.nhn?code={code}&page={page}', fake_price_page(code, page, days))
+
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return path
+
+# 실제 서버의 응답을 그대로 저장
+def record_fixtures(path, codes, pages=BENCH_PAGES):
+    os.makedirs(path, exist_ok=True)
+    manifest = {}
+    session = pystock.get_session()
+    urls = ['https://kind.krx.co.kr/corpgeneral/corpList.do?method=download',
+            'https://finance.naver.com/sise/nxt_sise_quant.naver']
+    for code in codes:
+        urls.append(f'https://finance.naver.com/item/main.nhn?code={code}')
+        urls += [f'https://finance.naver.com/item/sise_day.nhn?code={code}&page={page}' for page in range(1, pages + 1)]
+
+    for url in urls:
+        res = session.get(url, timeout=pystock.FETCH_TIMEOUT)
+        res.raise_for_status()
+        filename = f'{len(manifest):05d}.bin'
+        with open(os.path.join(path, filename), 'wb') as f:
+            f.write(res.content)
+        manifest[request_key(url)] = {'file' : filename, 'content_type' : res.headers.get('Content-Type', 'text/html')}
+        print(f"저장 : {url}")
+        time.sleep(0.2)
+
+    with open(os.path.join(path, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+
+# ---------------------------------------------------------------------------
+# 로컬 응답 서버
+# ---------------------------------------------------------------------------
+
+# 응답을 찾기 위한 키 (주소의 경로 + 정렬된 쿼리)
+def request_key(url):
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query)))
+    return f'{parts.path}?{query}' if query else parts.path
+
+# 저장된 응답을 지연 시간을 주어 돌려주는 서버
+class FixtureServer:
+    def __init__(self, path, latency=0.03, jitter=0.01):
+        with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+        self.responses = {}
+        for key, entry in manifest.items():
+            with open(os.path.join(path, entry['file']), 'rb') as f:
+                self.responses[key] = (f.read(), entry['content_type'])
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(max(0, server.latency + random.uniform(-server.jitter, server.jitter)))
+                found = server.responses.get(request_key(self.path))
+                body, content_type = found or (b'not found', 'text/plain')
+                self.send_response(200 if found else 404)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.httpd.server_port}'
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        # 모든 요청을 로컬 서버로
+        for origin in ORIGINS:
+            pystock.HTTP_HOST_OVERRIDES[origin] = self.url
+        return self
+
+    def __exit__(self, *exc):
+        for origin in ORIGINS:
+            pystock.HTTP_HOST_OVERRIDES.pop(origin, None)
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---------------------------------------------------------------------------
+# 측정
+# ---------------------------------------------------------------------------
+
+# pystock의 캐시 초기화
+def reset_state(disk=False):
+    pystock.clear_http_cache()
+    pystock._chart_cache.clear()
+    pystock._timeframes.clear()
+    pystock.reset_prefetch()
+    if disk:
+        pystock._stock_index = None
+        for path in (pystock.STOCK_LIST_PATH, pystock.PRICE_DB_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+
+# 백분위수 (nearest-rank)
+def percentile(values, q):
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(q / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+# 측정 항목 목록 (이름, 준비 함수, 측정 함수)
+def bench_cases():
+    name, code = BENCH_STOCKS[0]
+    names = [stock[0] for stock in BENCH_STOCKS]
+    main_html = pystock.http_get(f'https://finance.naver.com/item/main.nhn?code={code}')
+    daily = pystock.get_price_table(code, pages=BENCH_PAGES)
+    # 마지막 봉만 새로 들어온 상태
+    indicators = pystock.compute_indicators(daily.iloc[:-1])
+    six_months = pystock.pd.Timestamp.today().normalize() - pystock.pd.DateOffset(months=6)
+
+    def warm_search():
+        reset_state()
+        pystock.load_stock_view(name, 'D')
+        pystock._chart_cache.clear()
+
+    # 주기별 시세와 보조지표를 계산해 둔 상태에서 새 일봉 하나가 들어옴
+    def before_new_bar():
+        reset_state()
+        pystock.update_timeframes(code, daily.iloc[:-1], BENCH_PAGES)
+        for period in pystock.PERIOD_PAGES:
+            pystock.get_period_indicators(code, period, pystock.get_period_table(code, period, refresh=False))
+
+    def new_bar():
+        pystock.update_timeframes(code, daily, BENCH_PAGES)
+        for period in pystock.PERIOD_PAGES:
+            pystock.get_period_indicators(code, period, pystock.get_period_table(code, period, refresh=False))
+
+    # 인기 주식 창에서 미리 불러온 상태
+    def prefetched():
+        reset_state()
+        pystock.prefetch_stock(name)
+
+    cases = [
+        # 함수별
+        ('get_stock_code (cold)', lambda : reset_state(disk=True), lambda : pystock.get_stock_code(name)),
+        ('get_stock_code (warm)', None, lambda : pystock.get_stock_code(name)),
+        ('parse_stock_info', None, lambda : pystock.parse_stock_info(main_html)),
+        # 비교용 : 이전 방식의 BeautifulSoup 전체 트리 생성
+        ('bs4 tree (reference)', None, lambda : pystock.bs4.BeautifulSoup(main_html, 'html.parser')),
+        ('get_stock_info', reset_state, lambda : pystock.get_stock_info(code)),
+        ('get_price_table D (cold)', lambda : reset_state(disk=True), lambda : pystock.get_price_table(code, pages=3)),
+        ('get_price_table M (cold)', lambda : reset_state(disk=True), lambda : pystock.get_price_table(code, pages=BENCH_PAGES)),
+        ('get_price_table M (warm)', reset_state, lambda : pystock.get_price_table(code, pages=BENCH_PAGES)),
+        ('get_price_range 6M (cold)', lambda : reset_state(disk=True), lambda : pystock.get_price_range(code, six_months)),
+        ('get_popular_stock', reset_state, lambda : pystock.get_popular_stock()),
+        ('resample_ohlcv W', None, lambda : pystock.resample_ohlcv(daily, 'W')),
+        ('resample_ohlcv M', None, lambda : pystock.resample_ohlcv(daily, 'M')),
+        ('compute_indicators (full)', None, lambda : pystock.compute_indicators(daily)),
+        ('compute_indicators (append)', None, lambda : pystock.compute_indicators(daily, indicators)),
+        ('new bar (D/W/M + indicators)', before_new_bar, new_bar),
+        ('plot_candle_chart', None, lambda : pystock.render_candle_chart(daily.tail(30))),
+        # 그림 폭에 맞게 봉 수를 줄여서 그리기
+        ('plot_candle_chart (600 bars)', None, lambda : pystock.render_candle_chart(daily)),
+        # 화면 흐름
+        ('search (cold)', lambda : reset_state(disk=True), lambda : pystock.load_stock_view(name, 'D')),
+        ('search (warm)', reset_state, lambda : pystock.load_stock_view(name, 'D')),
+        ('drill-down (prefetched)', prefetched, lambda : pystock.load_stock_view(name, 'D')),
+        ('period switch', warm_search, lambda : pystock.load_stock_view(name, 'M', with_info=False)),
+        ('compare refresh', reset_state, lambda : pystock.load_compare_view(names, 'D')),
+    ]
+    # 비동기 API (aiohttp가 설치된 경우)
+    if importlib.util.find_spec('aiohttp'):
+        codes = [stock[1] for stock in BENCH_STOCKS]
+        cases += [
+            ('quotes (sync, sequential)', reset_state, lambda : [pystock.get_quote(c) for c in codes]),
+            ('gather_quotes (async)', reset_state, lambda : asyncio.run(pystock.gather_quotes(codes))),
+            ('async price_table M (cold)', lambda : reset_state(disk=True),
+             lambda : asyncio.run(pystock.async_get_price_table(code, BENCH_PAGES))),
+        ]
+    return cases
+
+# 항목별로 반복 측정하여 p50 / p95 / 평균 (ms)
+def run_benchmarks(repeat=10, only=None):
+    results = {}
+    for case_name, setup, fn in bench_cases():
+        if only and not any(word in case_name for word in only):
+            continue
+        # 처음 한 번은 측정하지 않음 (모듈 로딩 등)
+        if setup:
+            setup()
+        fn()
+        timings = []
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[case_name] = {
+            'p50' : percentile(timings, 50),
+            'p95' : percentile(timings, 95),
+            'mean' : sum(timings) / len(timings),
+            'runs' : repeat
+        }
+        print(f"{case_name:<28} p50 {results[case_name]['p50']:9.2f}ms   p95 {results[case_name]['p95']:9.2f}ms")
+    return results
+
+# 기준 결과와 비교 (threshold 이상 느려진 항목은 회귀)
+def compare_baseline(results, baseline, threshold=0.2):
+    regressions = []
+    print(f"\n{'항목':<28} {'기준 p50':>12} {'현재 p50':>12} {'변화':>8}")
+    for case_name, current in results.items():
+        base = baseline.get('results', {}).get(case_name)
+        if not base:
+            continue
+        change = (current['p50'] - base['p50']) / base['p50'] if base['p50'] else 0
+        mark = '❌' if change > threshold else ''
+        if mark:
+            regressions.append(case_name)
+        print(f"{case_name:<28} {base['p50']:10.2f}ms {current['p50']:10.2f}ms {change:+7.1%} {mark}")
+    return regressions
+
+# 현재 커밋 (기준 결과 기록용)
+def current_commit():
+    try:
+        import subprocess
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return ''
+
+def run_main(args):
+    workdir = tempfile.mkdtemp(prefix='pystock-bench-')
+    try:
+        fixtures = args.fixtures or generate_fixtures(os.path.join(workdir, 'fixtures'))
+        pystock.set_cache_dir(os.path.join(workdir, 'cache'))
+        # 로컬 서버만 사용하므로 요청 속도 제한 없음
+        pystock.set_rate_limit(args.rate)
+        with FixtureServer(fixtures, args.latency / 1000, args.jitter / 1000) as server:
+            print(f"응답 서버 : {server.url} (지연 {args.latency}ms ± {args.jitter}ms, {args.repeat}회 반복)\n")
+            results = run_benchmarks(args.repeat, args.only.split(',') if args.only else None)
+    finally:
+        pystock.shutdown_chart_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'commit' : current_commit(),
+        'created' : time.strftime('%Y-%m-%d %H:%M:%S'),
+        'latency_ms' : args.latency,
+        'jitter_ms' : args.jitter,
+        'results' : results
+    }
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장 : {args.save}")
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ 느려진 항목 : {', '.join(regressions)}")
+            return 1
+    return 0
+
+# ---------------------------------------------------------------------------
+# 회귀 확인 (빠른 경로가 이전 방식과 같은 결과를 내는지)
+# ---------------------------------------------------------------------------
+
+CHECKS = []
+
+# 확인 항목 등록 (실패하면 AssertionError)
+def check(fn):
+    CHECKS.append(fn)
+    return fn
+
+# 필요한 영역만 파싱한 결과가 문서 전체를 파싱한 결과와 같은지 (NXT 시세 영역이 없는 페이지와 있는 페이지)
+@check
+def check_quote_regions():
+    parse_region = pystock.StockInfoParser.parse_region
+    whole = []
+
+    def record(parser, html, start=0, stop_on_close=True):
+        if not stop_on_close:
+            whole.append(start)
+        return parse_region(parser, html, start, stop_on_close)
+
+    for _, code in BENCH_STOCKS:
+        for nxt in (False, True):
+            html = fake_main_page(code, nxt)
+            full = pystock.parse_quote(html, regions=None)
+            whole.clear()
+            pystock.StockInfoParser.parse_region = record
+            try:
+                fast = pystock.parse_quote(html)
+            finally:
+                pystock.StockInfoParser.parse_region = parse_region
+            name = f"{code}{' (NXT)' if nxt else ''}"
+            assert not whole, f"{name} : 문서 전체를 다시 파싱함"
+            assert fast == full, f"{name} : 결과가 다름 {fast} != {full}"
+
+# 이력이 짧은 종목(신규 상장 등)도 보조지표를 모두 켠 차트를 그릴 수 있는지 (RSI가 빠져도 MACD 패널 번호가 이어지는지)
+@check
+def check_short_series_chart():
+    pd, np = pystock.pd, pystock.np
+    for days in (1, 8, 14, 15, 70, 300):
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, name='Date')
+        close = 10000 + np.arange(days) % 7 * 100.0
+        daily = pd.DataFrame({'Open' : close, 'High' : close + 200, 'Low' : close - 200, 'Close' : close + 50,
+                              'Volume' : 1000.0}, index=index)
+        for period, df in (('D', daily), ('W', pystock.aggregate_ohlcv(daily, 'W')), ('M', pystock.aggregate_ohlcv(daily, 'M'))):
+            specs = pystock.indicator_plot_specs(pystock.compute_indicators(df), tuple(pystock.INDICATORS))
+            panels = sorted({spec['panel'] for spec in specs} - {0})
+            assert panels == list(range(2, 2 + len(panels))), f"{period} {len(df)}봉 : 패널 번호 {panels}"
+            try:
+                pystock.render_candle_chart(df, None, specs)
+            except ValueError as e:
+                raise AssertionError(f"{period} {len(df)}봉 : {e}")
+
+def check_main(args):
+    # 차트는 현재 프로세스에서 그리기
+    pystock.CHART_WORKERS = 0
+    failed = 0
+    for fn in CHECKS:
+        if args.only and not any(name in fn.__name__ for name in args.only.split(',')):
+            continue
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            print(f"❌ {fn.__name__} : {e}")
+            failed += 1
+    return 1 if failed else 0
+
+# ---------------------------------------------------------------------------
+# 시작 시간 (python -X importtime)
+# ---------------------------------------------------------------------------
+
+# 메인 메뉴를 띄우기 전까지 실행되는 import (pystock + PySimpleGUI)
+STARTUP_CODE = 'import pystock; pystock.sg.load()'
+# 메인 메뉴가 뜨기 전에 불러오면 안 되는 모듈
+STARTUP_DEFERRED = ['pandas', 'numpy', 'requests', 'bs4', 'matplotlib', 'mplfinance', 'asyncio', 'aiohttp']
+
+# -X importtime 출력 -> [(모듈, self us, cumulative us, 깊이)]
+def parse_importtime(output):
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+# 새 인터프리터에서 한 번 실행 -> (전체 ms, import 기록)
+def measure_startup(code=STARTUP_CODE):
+    import subprocess
+    env = dict(os.environ)
+    # 바이트코드 캐시를 쓰지 못하면 매번 컴파일 시간이 더해짐
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(result.stderr)
+
+def startup_main(args):
+    # 첫 실행은 바이트코드 캐시 생성용
+    measure_startup(args.code)
+    totals = []
+    imports = {}
+    modules = set()
+    for _ in range(args.repeat):
+        elapsed, rows = measure_startup(args.code)
+        totals.append(elapsed)
+        for name, _, cumulative, depth in rows:
+            modules.add(name)
+            if depth == 0:
+                imports.setdefault(name, []).append(cumulative / 1000)
+
+    total = percentile(totals, 50)
+    print(f"시작 시간 ({args.repeat}회, {args.code})")
+    print(f"{'프로세스 전체':<28} p50 {total:9.2f}ms   p95 {percentile(totals, 95):9.2f}ms   목표 {args.target:.0f}ms\n")
+    slowest = sorted(imports.items(), key=lambda item: percentile(item[1], 50), reverse=True)[:args.top]
+    for name, timings in slowest:
+        print(f"{name:<28} p50 {percentile(timings, 50):9.2f}ms")
+
+    failed = False
+    loaded = [name for name in STARTUP_DEFERRED if any(module == name or module.startswith(name + '.') for module in modules)]
+    if loaded:
+        print(f"\n❌ 메뉴 전에 불러온 모듈 : {', '.join(loaded)}")
+        failed = True
+    if total > args.target:
+        print(f"\n❌ 목표 시간 초과 : {total:.2f}ms > {args.target:.0f}ms")
+        failed = True
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='pystock 오프라인 벤치마크')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='로컬 응답 서버로 벤치마크 실행')
+    run.add_argument('--fixtures', help='저장된 응답 폴더 (기본값 : 가짜 응답 생성)')
+    run.add_argument('--latency', type=float, default=30, help='응답 지연 시간 (ms)')
+    run.add_argument('--jitter', type=float, default=10, help='응답 지연 시간 흔들림 (ms)')
+    run.add_argument('--repeat', type=int, default=10, help='항목별 반복 횟수')
+    run.add_argument('--rate', type=float, default=0, help='초당 최대 요청 수 (0이면 제한 없음)')
+    run.add_argument('--only', help='측정할 항목 (쉼표로 구분, 이름 일부)')
+    run.add_argument('--save', help='결과를 저장할 JSON 파일')
+    run.add_argument('--baseline', help='비교할 기준 결과 JSON 파일')
+    run.add_argument('--threshold', type=float, default=0.2, help='회귀로 판단할 p50 증가 비율')
+
+    record = commands.add_parser('record', help='실제 서버 응답을 저장 (인터넷 필요)')
+    record.add_argument('path', help='응답을 저장할 폴더')
+    record.add_argument('--codes', default=','.join(code for _, code in BENCH_STOCKS), help='종목코드 (쉼표로 구분)')
+    record.add_argument('--pages', type=int, default=BENCH_PAGES, help='종목별 일별 시세 페이지 수')
+
+    checks = commands.add_parser('check', help='빠른 경로가 이전 방식과 같은 결과를 내는지 확인')
+    checks.add_argument('--only', help='확인할 항목 (쉼표로 구분, 이름 일부)')
+
+    startup = commands.add_parser('startup', help='메인 메뉴가 뜨기 전까지의 시작 시간 측정')
+    startup.add_argument('--repeat', type=int, default=10, help='반복 횟수')
+    startup.add_argument('--target', type=float, default=300, help='목표 시간 (ms, 넘으면 실패)')
+    startup.add_argument('--top', type=int, default=10, help='오래 걸린 모듈 표시 개수')
+    startup.add_argument('--code', default=STARTUP_CODE, help='측정할 코드')
+
+    args = parser.parse_args(argv)
+    if args.command == 'startup':
+        return startup_main(args)
+    if args.command == 'check':
+        return check_main(args)
+    if args.command == 'record':
+        record_fixtures(args.path, args.codes.split(','), args.pages)
+        return 0
+    return run_main(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
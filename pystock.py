@@ -1,268 +1,2648 @@
-import PySimpleGUI as sg
-import requests
-from bs4 import BeautifulSoup
-import mplfinance as mpf
-import pandas as pd
 import io
 import os
+import sys
+import csv
+import json
+import time
+import datetime
+import enum
+import argparse
+import random
+import re
+import urllib.parse
+import logging
+import contextlib
+import contextvars
+import importlib
+import bisect
+import threading
+import sqlite3
+from html.parser import HTMLParser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, BrokenExecutor, as_completed, wait, FIRST_COMPLETED
+
+# 처음 사용할 때 불러오는 모듈 (메인 메뉴가 PySimpleGUI만 불러오고 바로 뜨도록)
+class LazyModule:
+    def __init__(self, name, setup=None):
+        self._name = name
+        self._setup = setup
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            # 불러오기 전에 필요한 설정 (예: matplotlib 백엔드)
+            if self._setup:
+                self._setup()
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        # 한 번 찾은 속성은 인스턴스에 저장 (다음부터는 __getattr__를 거치지 않음)
+        value = getattr(self.load(), attr)
+        setattr(self, attr, value)
+        return value
+
+# 차트는 PNG 바이트로만 그리므로 화면 없는 백엔드 사용
+# (pyplot이 TkAgg를 고르면 PySimpleGUI의 Tk 메인 루프와 다른 스레드에서 그림 창을 만들게 됨)
+def use_agg_backend():
+    import matplotlib
+    matplotlib.use('Agg')
+
+sg = LazyModule('PySimpleGUI')
+pd = LazyModule('pandas')
+np = LazyModule('numpy')
+requests = LazyModule('requests')
+bs4 = LazyModule('bs4')
+# 비동기 API에서만 사용 (aiohttp는 설치되어 있지 않아도 나머지 기능은 동작)
+asyncio = LazyModule('asyncio')
+aiohttp = LazyModule('aiohttp')
+mpf = LazyModule('mplfinance', setup=use_agg_backend)
+plt = LazyModule('matplotlib.pyplot', setup=use_agg_backend)
+font_manager = LazyModule('matplotlib.font_manager')
+
+# 메인 메뉴가 뜬 뒤 미리 불러올 모듈 (첫 검색이 import를 기다리지 않도록)
+PRELOAD_MODULES = [np, pd, requests, bs4, mpf, plt, font_manager]
+
+# 무거운 모듈을 백그라운드 스레드에서 미리 불러오기
+def preload_modules(modules=PRELOAD_MODULES):
+    def run():
+        for module in modules:
+            try:
+                module.load()
+            except Exception as e:
+                print(f"❌ 모듈 미리 불러오기 실패 ({module._name}) : {e}")
+    thread = threading.Thread(target=run, name='pystock-preload', daemon=True)
+    thread.start()
+    return thread
+
+# 상태 표시줄에 보여줄 단계 순서
+TRACE_STAGES = ['listing', 'fetch', 'parse', 'store', 'resample', 'indicators', 'plot']
+# 작업별 기록을 JSON Lines로 남길 파일 (환경 변수 PYSTOCK_TRACE_LOG 또는 set_trace_log)
+TRACE_LOG_PATH = os.environ.get('PYSTOCK_TRACE_LOG')
+
+logger = logging.getLogger('pystock')
+_current_trace = contextvars.ContextVar('pystock_trace', default=None)
+_trace_log_lock = threading.Lock()
+
+# 작업 하나(검색, 비교, 인기 주식 등)의 단계별 소요 시간과 요청 통계
+class Trace:
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.elapsed = None
+        # 단계 -> [(시작, 끝)] (여러 스레드에서 동시에 진행된 구간은 합쳐서 계산)
+        self.intervals = {}
+        self.counters = {'requests' : 0, 'hits' : 0, 'bytes' : 0}
+        self.lock = threading.Lock()
+
+    def add(self, stage, start, end):
+        with self.lock:
+            self.intervals.setdefault(stage, []).append((start, end))
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    # 단계별 소요 시간 (ms, 겹치는 구간은 한 번만)
+    def spans(self):
+        result = {}
+        with self.lock:
+            items = {stage : sorted(intervals) for stage, intervals in self.intervals.items()}
+        for stage, intervals in items.items():
+            total, current_start, current_end = 0, None, None
+            for start, end in intervals:
+                if current_end is None or start > current_end:
+                    if current_end is not None:
+                        total += current_end - current_start
+                    current_start, current_end = start, end
+                else:
+                    current_end = max(current_end, end)
+            if current_end is not None:
+                total += current_end - current_start
+            result[stage] = total * 1000
+        order = {stage : i for i, stage in enumerate(TRACE_STAGES)}
+        return dict(sorted(result.items(), key=lambda item : order.get(item[0], len(order))))
+
+    # 상태 표시줄 문자열 (예: fetch 820ms · parse 140ms · plot 310ms)
+    def summary(self):
+        parts = [f"{stage} {ms:.0f}ms" for stage, ms in self.spans().items()]
+        if self.counters['bytes']:
+            parts.append(f"{self.counters['bytes'] / 1024:.0f}KB")
+        if self.counters['hits']:
+            parts.append(f"캐시 {self.counters['hits']}회")
+        if self.counters.get('prefetch'):
+            parts.append("미리 불러옴")
+        if self.elapsed is not None:
+            parts.append(f"전체 {self.elapsed * 1000:.0f}ms")
+        return ' · '.join(parts)
+
+    def to_dict(self):
+        return {
+            'name' : self.name,
+            'started' : time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'total_ms' : round(self.elapsed * 1000, 1) if self.elapsed is not None else None,
+            'spans_ms' : {stage : round(ms, 1) for stage, ms in self.spans().items()},
+            'counters' : dict(self.counters)
+        }
+
+# 작업 기록 파일 지정 (None이면 기록하지 않음)
+def set_trace_log(path):
+    global TRACE_LOG_PATH
+    TRACE_LOG_PATH = path
+
+# 현재 작업의 기록 (없으면 None)
+def current_trace():
+    return _current_trace.get()
+
+# 작업 기록 시작 (끝나면 로그와 기록 파일에 남김)
+@contextlib.contextmanager
+def traced(name):
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        logger.debug("%s : %s", name, trace.summary())
+        if TRACE_LOG_PATH:
+            with _trace_log_lock:
+                with open(TRACE_LOG_PATH, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + '\n')
+
+# 단계 소요 시간 측정 (진행 중인 작업 기록이 있을 때만)
+@contextlib.contextmanager
+def span(stage):
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, start, time.perf_counter())
+
+# 스레드 풀에서도 현재 작업 기록이 이어지도록 map 실행
+def map_in_context(executor, fn, items):
+    items = list(items)
+    contexts = [contextvars.copy_context() for _ in items]
+    return executor.map(lambda pair : pair[0].run(fn, pair[1]), zip(contexts, items))
+
+# 로컬 캐시 경로
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.pystock')
+STOCK_LIST_PATH = os.path.join(CACHE_DIR, 'krx_list.csv')
+# 상장 종목 목록 유효 시간 (초)
+STOCK_LIST_TTL = 24 * 60 * 60
+
+# 동시 요청 설정
+FETCH_WORKERS = 8
+# 호스트별 초당 최대 요청 수 (서버 부하 방지, 0이면 제한 없음)
+FETCH_RATE_LIMIT = 10
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5
+FETCH_TIMEOUT = 10
+# 응답 캐시 최대 개수
+HTTP_CACHE_SIZE = 512
+# 주소별 응답 캐시 유효 시간 (초, 위에서부터 먼저 일치하는 규칙 사용)
+HTTP_CACHE_POLICIES = [
+    # 한국거래소 상장 종목 목록
+    (re.compile(r'corpList\.do'), 24 * 60 * 60),
+    # 일별 시세 (오늘 시세가 바뀌고, 새 거래일마다 모든 페이지가 한 행씩 밀리므로 이전 페이지도 같게)
+    (re.compile(r'sise_day\.\w+\?'), 60),
+    # 종목 현재 시세
+    (re.compile(r'item/main\.\w+\?'), 10),
+    # 인기 종목 순위
+    (re.compile(r'sise_quant'), 5),
+]
+# 요청 주소의 앞부분 바꾸기 (예: 벤치마크용 로컬 서버 {'https://finance.naver.com' : 'http://127.0.0.1:8000'})
+HTTP_HOST_OVERRIDES = {}
+
+_session = None
+_session_lock = threading.Lock()
+_buckets = {}
+_buckets_lock = threading.Lock()
+_http_cache = OrderedDict()
+_http_cache_lock = threading.Lock()
+_http_stats = {'requests' : 0, 'hits' : 0, 'misses' : 0, 'revalidated' : 0, 'retries' : 0, 'errors' : 0, 'bytes' : 0}
+_http_stats_lock = threading.Lock()
+
+# 연결을 재사용하는 공용 세션
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=FETCH_WORKERS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers.update({'User-Agent' : 'Mozilla/5.0'})
+        return _session
+
+# 호스트별 요청 속도 제한 (토큰 버킷)
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.lock = threading.Lock()
+
+    # 토큰을 얻으면 0, 없으면 다음 토큰까지 기다릴 시간(초)
+    # 낮은 우선순위 요청은 기다리는 일반 요청이 없고 토큰이 절반 넘게 남았을 때만 (일반 요청 몫을 남겨 둠)
+    def try_acquire(self, background=False):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if background and self.waiting:
+                return 1 / self.rate
+            needed = 1 + (self.capacity // 2 if background else 0)
+            if self.tokens >= needed:
+                self.tokens -= 1
+                return 0
+            return (needed - self.tokens) / self.rate
+
+    # 토큰 하나를 얻을 때까지 대기
+    def acquire(self):
+        with self.lock:
+            self.waiting += 1
+        try:
+            while True:
+                wait = self.try_acquire()
+                if not wait:
+                    return
+                time.sleep(wait)
+        finally:
+            with self.lock:
+                self.waiting -= 1
+
+# 요청 속도 제한 변경 (호스트별 초당 요청 수)
+def set_rate_limit(rate):
+    global FETCH_RATE_LIMIT
+    FETCH_RATE_LIMIT = rate
+    with _buckets_lock:
+        _buckets.clear()
+
+# 호스트별 토큰 버킷 (속도 제한이 없으면 None)
+def get_rate_bucket(host):
+    if FETCH_RATE_LIMIT <= 0:
+        return None
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(FETCH_RATE_LIMIT)
+        return bucket
+
+# 미리 불러오기처럼 낮은 우선순위로 보내는 요청의 취소 확인 함수 (None이면 일반 요청)
+_background_requests = contextvars.ContextVar('pystock_background_requests', default=None)
+
+# 이 안에서 보내는 요청은 낮은 우선순위로 (cancelled()가 참이 되면 다음 요청 전에 TaskCancelled)
+@contextlib.contextmanager
+def background_requests(cancelled):
+    token = _background_requests.set(cancelled)
+    try:
+        yield
+    finally:
+        _background_requests.reset(token)
+
+# 요청 간격 조절
+def wait_rate_limit(host):
+    bucket = get_rate_bucket(host)
+    cancelled = _background_requests.get()
+    if cancelled is None:
+        if bucket:
+            bucket.acquire()
+        return
+
+    # 낮은 우선순위 요청은 기다리는 동안에도 취소 확인
+    while True:
+        check_cancelled(cancelled)
+        wait = bucket.try_acquire(background=True) if bucket else 0
+        if not wait:
+            return
+        time.sleep(min(wait, 0.1))
+
+# 요청 통계 증가
+def count_http(name, amount=1):
+    with _http_stats_lock:
+        _http_stats[name] += amount
+    trace = current_trace()
+    if trace and name in trace.counters:
+        trace.count(name, amount)
+
+# 요청 통계 (캐시 적중/실패 횟수 등)
+def http_stats():
+    with _http_stats_lock:
+        return dict(_http_stats)
+
+# 요청 통계 초기화
+def reset_http_stats():
+    with _http_stats_lock:
+        for name in _http_stats:
+            _http_stats[name] = 0
+
+# 주소에 맞는 응답 캐시 유효 시간
+def http_cache_ttl(url):
+    for pattern, ttl in HTTP_CACHE_POLICIES:
+        if pattern.search(url):
+            return ttl
+    return 0
+
+# 응답 캐시 비우기
+def clear_http_cache():
+    with _http_cache_lock:
+        _http_cache.clear()
+
+# 응답 캐시 저장
+def store_http_cache(url, text, ttl, etag=None, last_modified=None):
+    with _http_cache_lock:
+        _http_cache[url] = {'expires' : time.monotonic() + ttl, 'text' : text, 'etag' : etag, 'last_modified' : last_modified}
+        _http_cache.move_to_end(url)
+        while len(_http_cache) > HTTP_CACHE_SIZE:
+            _http_cache.popitem(last=False)
+
+# 바꿀 주소가 지정된 경우 요청 주소 변경
+def resolve_url(url):
+    for origin, target in HTTP_HOST_OVERRIDES.items():
+        if url.startswith(origin):
+            return target + url[len(origin):]
+    return url
+
+# 응답 캐시 확인 -> (유효한 캐시 본문 또는 None, 캐시 항목, 조건부 요청 헤더)
+def lookup_http_cache(url, ttl):
+    with _http_cache_lock:
+        cached = _http_cache.get(url)
+    if cached and ttl > 0 and cached['expires'] > time.monotonic():
+        count_http('hits')
+        return cached['text'], cached, {}
+
+    # 캐시가 만료되었으면 변경 여부만 확인
+    headers = {}
+    if cached and cached['etag']:
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached['last_modified']:
+        headers['If-Modified-Since'] = cached['last_modified']
+    return None, cached, headers
+
+# 받은 응답 기록 및 캐시 저장 (304면 캐시된 본문 사용, text는 본문을 읽는 함수)
+def finish_http_response(url, ttl, cached, status, size, text, etag=None, last_modified=None):
+    count_http('bytes', size)
+    if status == 304 and cached:
+        count_http('revalidated')
+        text = cached['text']
+    else:
+        count_http('misses')
+        text = text()
+    if ttl > 0:
+        store_http_cache(url, text, ttl, etag, last_modified)
+    return text
+
+# 재시도할 상태 코드 (서버 오류, 요청 과다)
+def is_retryable_status(status):
+    return status >= 500 or status == 429
+
+# 실패한 요청을 다시 보낼 때까지 기다릴 시간(초), 다시 보내지 않으면 None (동기/비동기 요청 공용)
+# status가 None이면 연결 오류나 시간 초과로 보고 다시 시도
+def retry_delay(attempt, status=None):
+    if attempt == FETCH_RETRIES or (status is not None and not is_retryable_status(status)):
+        count_http('errors')
+        return None
+    count_http('retries')
+    return FETCH_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.5)
+
+# 공용 GET 요청 (캐시, 조건부 요청, 속도 제한, 실패 시 재시도)
+def http_get(url, ttl=None):
+    url = resolve_url(url)
+    ttl = http_cache_ttl(url) if ttl is None else ttl
+    text, cached, headers = lookup_http_cache(url, ttl)
+    if text is not None:
+        return text
+
+    host = urllib.parse.urlsplit(url).netloc
+    with span('fetch'):
+        for attempt in range(FETCH_RETRIES + 1):
+            wait_rate_limit(host)
+            count_http('requests')
+            try:
+                res = get_session().get(url, headers=headers, timeout=FETCH_TIMEOUT)
+                res.raise_for_status()
+                break
+            except requests.RequestException as e:
+                response = getattr(e, 'response', None)
+                delay = retry_delay(attempt, response.status_code if response is not None else None)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+
+    return finish_http_response(url, ttl, cached, res.status_code, len(res.content), lambda : res.text,
+                                res.headers.get('ETag'), res.headers.get('Last-Modified'))
+
+# 한글 초성 (검색어 'ㅅㅅㅈㅈ' -> 삼성전자)
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+
+_stock_index = None
+_stock_index_loaded_at = 0
+_stock_index_lock = threading.Lock()
+
+# 문자열을 초성 문자열로 변환 (한글이 아닌 문자는 소문자로 유지)
+def to_choseong(text):
+    result = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            result.append(CHOSEONG[code // 588])
+        else:
+            result.append(ch.lower())
+    return ''.join(result)
+
+# 한국거래소(KRX) 상장 종목 목록 주소
+STOCK_LIST_URL = "https://kind.krx.co.kr/corpgeneral/corpList.do?method=download"
+
+# 한국거래소(KRX) 상장 종목 목록 다운로드
+def download_stock_list():
+    text = http_get(STOCK_LIST_URL)
+    with span('parse'):
+        df = pd.read_html(io.StringIO(text), header=0)[0]
+    df = df[['회사명', '종목코드']]
+    df['종목코드'] = df['종목코드'].apply(lambda x : str(x).zfill(6))
+    df['회사명'] = df['회사명'].str.strip()
+    return df
+
+# 디스크에 저장된 상장 종목 목록이 유효 시간 안인지 확인
+def stock_list_fresh():
+    return os.path.exists(STOCK_LIST_PATH) and time.time() - os.path.getmtime(STOCK_LIST_PATH) < STOCK_LIST_TTL
+
+# 상장 종목 목록 가져오기 (디스크 캐시 우선, 유효 시간이 지나면 새로 다운로드)
+def load_stock_list(force=False):
+    cached = os.path.exists(STOCK_LIST_PATH)
+    if stock_list_fresh() and not force:
+        return pd.read_csv(STOCK_LIST_PATH, dtype=str)
+
+    try:
+        df = download_stock_list()
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_csv(STOCK_LIST_PATH, index=False)
+        return df
+    except Exception as e:
+        # 다운로드 실패 시 오래된 캐시라도 사용
+        if cached:
+            print("❌ 종목 목록 갱신 실패, 기존 목록 사용 :", e)
+            return pd.read_csv(STOCK_LIST_PATH, dtype=str)
+        raise
+
+# 검색용 인덱스 생성
+def build_stock_index(df):
+    names = df['회사명'].tolist()
+    codes = df['종목코드'].tolist()
+    lowers = [name.lower() for name in names]
+    index = {
+        'names' : names,
+        'codes' : codes,
+        'lowers' : lowers,
+        'choseongs' : [to_choseong(name) for name in names],
+        # 소문자 회사명 / 종목코드 -> 위치
+        'exact' : {},
+        # 접두어 검색용 정렬 목록
+        'sorted' : sorted((lower, i) for i, lower in enumerate(lowers))
+    }
+    for i, lower in enumerate(lowers):
+        index['exact'].setdefault(lower, i)
+    for i, code in enumerate(codes):
+        index['exact'].setdefault(code, i)
+    return index
+
+# 메모리 인덱스와 디스크 목록이 모두 만료되어 목록을 새로 받아야 하는지 확인
+def stock_index_stale():
+    with _stock_index_lock:
+        loaded = _stock_index is not None and time.time() - _stock_index_loaded_at < STOCK_LIST_TTL
+    return not loaded and not stock_list_fresh()
+
+# 메모리 인덱스 가져오기 (유효 시간이 지나면 다시 불러오기)
+def get_stock_index(force=False):
+    global _stock_index, _stock_index_loaded_at
+    with _stock_index_lock:
+        stale = time.time() - _stock_index_loaded_at >= STOCK_LIST_TTL
+        if _stock_index is None or stale or force:
+            _stock_index = build_stock_index(load_stock_list(force=force))
+            _stock_index_loaded_at = time.time()
+        return _stock_index
+
+# 종목 이름으로 후보 종목 검색 (정확히 일치 > 접두어 > 포함 > 초성 순)
+def search_stock(stock_name, limit=10):
+    index = get_stock_index()
+    search_name = stock_name.strip().lower()
+    if not search_name:
+        return []
+
+    names = index['names']
+    # (일치 종류, 일치 위치, 이름 길이, 인덱스)
+    ranked = {}
+
+    def add(i, kind, pos):
+        rank = (kind, pos, len(names[i]), i)
+        if i not in ranked or rank < ranked[i]:
+            ranked[i] = rank
+
+    # 정확히 일치 (회사명 또는 종목코드)
+    if search_name in index['exact']:
+        add(index['exact'][search_name], 0, 0)
+
+    # 접두어 일치
+    sorted_names = index['sorted']
+    pos = bisect.bisect_left(sorted_names, (search_name, -1))
+    while pos < len(sorted_names) and sorted_names[pos][0].startswith(search_name):
+        add(sorted_names[pos][1], 1, 0)
+        pos += 1
+
+    # 부분 일치
+    for i, lower in enumerate(index['lowers']):
+        found = lower.find(search_name)
+        if found > 0:
+            add(i, 2, found)
+
+    # 초성 일치 (검색어가 초성으로만 이루어진 경우)
+    query = search_name.replace(' ', '')
+    if query and all(ch in CHOSEONG for ch in query):
+        for i, choseong in enumerate(index['choseongs']):
+            found = choseong.replace(' ', '').find(query)
+            if found >= 0:
+                add(i, 3, found)
+
+    results = sorted(ranked.values())[:limit]
+    return [(names[i], index['codes'][i]) for _, _, _, i in results]
 
 # 종목 이름으로 코드 가져오기
 def get_stock_code(stock_name):
     try:
-        url = "https://kind.krx.co.kr/corpgeneral/corpList.do?method=download"
-        res = requests.get(url)
-        df = pd.read_html(io.StringIO(res.text), header=0)[0]
-        df = df[['회사명', '종목코드']]
-        df['종목코드'] = df['종목코드'].apply(lambda x : f"{x:06d}")
-        df['회사명'] = df['회사명'].str.strip()
-        search_name = stock_name.strip().lower()
-
-        # 정확히 일치하는 경우는 해당 종목 선택
-        exact_match = df[df['회사명'].str.lower() == search_name]
-        if not exact_match.empty:
-            row = exact_match.iloc[0]
-            return row['회사명'], row['종목코드']
-
-        # 정확히 일치하는 종목이 없는 경우
-        # 해당 단어를 포함한 가장 먼저 발견된 종목
-        partial_match = df[df['회사명'].str.lower().str.contains(search_name)]
-        if not partial_match.empty:
-            row = partial_match.iloc[0]
-            return row['회사명'], row['종목코드']
-
+        with span('listing'):
+            results = search_stock(stock_name, limit=1)
+        if results:
+            return results[0]
         return None, None
     # 해당 단어가 포함된 종목이 없을 때
     except Exception as e:
         print("❌ 종목 코드 조회 실패 :", e)
         return None, None
     
-# 종목 정보 가져오기 (네이버 금융)
-def get_stock_info(stock_code):
-    url = f"https://finance.naver.com/item/main.nhn?code={stock_code}"
-    headers = {'User-Agent' : 'Mozilla/5.0'}
-    info = {}
+# 종목 정보 페이지에서 필요한 부분 (시세 영역, 투자정보 영역)
+STOCK_INFO_REGIONS = ['id="rate_info_krx"', 'id="rate_info_nxt"', 'class="aside_invest_info"']
+# 값을 가져올 em 태그 id
+STOCK_INFO_FIELD_IDS = {'_market_sum', '_per', '_eps', '_cns_per', '_cns_eps'}
+# 닫는 태그가 없는 태그
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source', 'track', 'wbr'}
 
-    try:
-        res = requests.get(url, headers=headers)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        # nxt 우선, krx 후순위
-        rate_info = soup.select_one('div#rate_info_nxt[style*="display: block"]') or \
-            soup.select_one('div#rate_info_krx')
-
-        # 단위 및 결측값 처리
-        def safe_text(selector, suffix='', default='N/A'):
-            try:
-                text = selector.text.strip().replace(suffix, '').replace('\xa0', '')
-                return text + suffix if text and text != 'N/A' else default
-            except:
-                return default
+# 영역 파싱이 끝났을 때 중단용
+class StopParsing(Exception):
+    pass
+
+# 종목 정보 페이지를 트리 없이 한 번에 훑으며 필요한 값만 모으는 파서
+class StockInfoParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        # 시세 영역 ('krx', 'nxt') -> {'today', 'exday', 'no_info'}
+        self.regions = {}
+        self.nxt_visible = False
+        # em id -> 텍스트
+        self.fields = {}
+        # per_table 3번째 행(PBR, BPS)의 em 텍스트
+        self.pbr_ems = []
+        # th 라벨 목록 [라벨, per_table 안 여부, td 존재 여부, 첫 em 텍스트]
+        self.labels = []
+        self._stop_on_close = False
+        self._per_table_done = False
+        self._clear_state()
+
+    def _clear_state(self):
+        # (태그, 닫힐 때 실행할 함수 목록)
+        self._stack = []
+        self._buffers = []
+        self._region = None
+        self._in_today = False
+        self._in_exday = False
+        self._exday_em = None
+        self._in_no_info = False
+        self._no_info_td = None
+        self._in_td_em = False
+        self._in_per_table = False
+        self._per_tr_index = -1
+        self._pending_labels = []
+        self._label_td = None
+
+    # 문서의 일부분(start 위치의 태그가 닫힐 때까지)만 파싱
+    def parse_region(self, html, start=0, stop_on_close=True):
+        self.reset()
+        self._clear_state()
+        self._stop_on_close = stop_on_close
+        try:
+            self.feed(html[start:])
+            self.close()
+        except StopParsing:
+            pass
+
+    # 태그 안의 텍스트를 모아 닫힐 때 setter로 전달
+    def _capture(self, actions, setter):
+        buf = []
+        self._buffers.append(buf)
+
+        def done():
+            self._buffers.remove(buf)
+            setter(''.join(buf))
+        actions.append(done)
+
+    # 태그가 닫힐 때 속성을 원래 값으로 되돌림
+    def _restore(self, actions, name, value):
+        actions.append(lambda : setattr(self, name, value))
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = (attrs.get('class') or '').split()
+        tag_id = attrs.get('id')
+        actions = []
+
+        # 시세 영역 (rate_info_krx / rate_info_nxt)
+        if tag == 'div' and tag_id in ('rate_info_krx', 'rate_info_nxt'):
+            key = tag_id[len('rate_info_'):]
+            region = {'today' : None, 'exday' : [], 'no_info' : []}
+            self.regions[key] = region
+            if key == 'nxt' and 'display: block' in (attrs.get('style') or ''):
+                self.nxt_visible = True
+            self._restore(actions, '_region', self._region)
+            self._region = region
+
+        elif self._region is not None:
+            region = self._region
+            if tag == 'p' and 'no_today' in classes:
+                self._restore(actions, '_in_today', False)
+                self._in_today = True
+            elif tag == 'p' and 'no_exday' in classes:
+                self._restore(actions, '_in_exday', False)
+                self._in_exday = True
+            elif tag == 'em' and self._in_exday:
+                em = {'ico' : None, 'blind' : None}
+                region['exday'].append(em)
+                self._restore(actions, '_exday_em', None)
+                self._exday_em = em
+            elif tag == 'table' and 'no_info' in classes:
+                self._restore(actions, '_in_no_info', False)
+                self._in_no_info = True
+            elif tag == 'td' and self._in_no_info:
+                td = {'label' : None, 'value' : None}
+                region['no_info'].append(td)
+                self._restore(actions, '_no_info_td', None)
+                self._no_info_td = td
+            elif tag == 'em' and self._no_info_td is not None:
+                self._restore(actions, '_in_td_em', False)
+                self._in_td_em = True
+            elif tag == 'span':
+                em = self._exday_em
+                td = self._no_info_td
+                if 'blind' in classes:
+                    if self._in_today and region['today'] is None:
+                        self._capture(actions, lambda text : region.__setitem__('today', text))
+                    elif em is not None and em['blind'] is None:
+                        self._capture(actions, lambda text : em.__setitem__('blind', text))
+                    elif td is not None and self._in_td_em and td['value'] is None:
+                        self._capture(actions, lambda text : td.__setitem__('value', text))
+                elif 'ico' in classes and em is not None and em['ico'] is None:
+                    self._capture(actions, lambda text : em.__setitem__('ico', text))
+                elif 'sptxt' in classes and td is not None and td['label'] is None:
+                    self._capture(actions, lambda text : td.__setitem__('label', text))
+
+        # 시가총액, PER, EPS, 추정 PER, 추정 EPS
+        if tag == 'em' and tag_id in STOCK_INFO_FIELD_IDS and tag_id not in self.fields:
+            self._capture(actions, lambda text : self.fields.setdefault(tag_id, text))
+
+        # PBR, BPS (첫 번째 per_table의 3번째 행)
+        if tag == 'table' and 'per_table' in classes and not self._per_table_done:
+            self._per_table_done = True
+            self._in_per_table = True
+            self._per_tr_index = -1
+            self._restore(actions, '_in_per_table', False)
+        if self._in_per_table and tag == 'tr':
+            self._per_tr_index += 1
+        if self._in_per_table and tag == 'em' and self._per_tr_index == 2:
+            self._capture(actions, self.pbr_ems.append)
+
+        # th 라벨과 바로 뒤 td의 첫 em (배당수익률, 외국인소진율, 동일업종 PER)
+        if tag == 'tr':
+            self._pending_labels = []
+        elif tag == 'th':
+            label = [None, self._in_per_table, False, None]
+            self.labels.append(label)
+            self._pending_labels.append(label)
+            self._capture(actions, lambda text : label.__setitem__(0, text))
+        elif tag == 'td' and self._pending_labels:
+            labels = self._pending_labels
+            self._pending_labels = []
+            for label in labels:
+                label[2] = True
+            self._restore(actions, '_label_td', None)
+            self._label_td = labels
+        elif tag == 'em' and self._label_td:
+            labels = self._label_td
+            self._label_td = None
+
+            def set_em(text):
+                for label in labels:
+                    label[3] = text
+            self._capture(actions, set_em)
+
+        if tag not in VOID_TAGS:
+            self._stack.append((tag, actions))
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        while self._stack:
+            open_tag, actions = self._stack.pop()
+            for action in reversed(actions):
+                action()
+            if open_tag == tag:
+                break
+        if not self._stack and self._stop_on_close:
+            raise StopParsing
+
+    def handle_data(self, data):
+        for buf in self._buffers:
+            buf.append(data)
+
+    # 라벨이 포함된 첫 th 옆 td의 값
+    def label_value(self, keyword, per_table_only=False):
+        for text, in_per_table, has_td, em_text in self.labels:
+            if text is None or keyword not in text or (per_table_only and not in_per_table):
+                continue
+            if not has_td:
+                return None
+            return em_text.strip() if em_text is not None else ''
+        return None
+
+# 등락 방향
+class Direction(enum.Enum):
+    UP = '상승'
+    DOWN = '하락'
+    FLAT = '보합'
+    UPPER_LIMIT = '상한가'
+    LOWER_LIMIT = '하한가'
+
+    # 부호 (상승 1, 하락 -1, 보합 0)
+    @property
+    def sign(self):
+        if self in (Direction.UP, Direction.UPPER_LIMIT):
+            return 1
+        if self in (Direction.DOWN, Direction.LOWER_LIMIT):
+            return -1
+        return 0
+
+    # 페이지의 방향 문자열로 찾기 (없으면 None)
+    @classmethod
+    def from_text(cls, text):
+        text = (text or '').strip()
+        for direction in cls:
+            if direction.value == text:
+                return direction
+        return None
+
+# 정수 항목 (원, 주, 백만원, 억원)
+QUOTE_INT_FIELDS = ['price', 'change', 'prev_close', 'high', 'open', 'low', 'volume', 'trading_value',
+                    'market_cap', 'eps', 'est_eps', 'bps']
+# 실수 항목 (%, 배)
+QUOTE_FLOAT_FIELDS = ['change_rate', 'per', 'est_per', 'pbr', 'dividend_yield', 'foreign_rate', 'sector_per']
+
+# 종목 시세/투자 정보 (숫자로 보관, 화면에 보일 때만 문자열로 변환)
+class Quote:
+    __slots__ = ['name', 'code', 'direction'] + QUOTE_INT_FIELDS + QUOTE_FLOAT_FIELDS
+
+    def __init__(self, **values):
+        for field in self.__slots__:
+            setattr(self, field, values.get(field))
+
+    def to_dict(self):
+        return {field : getattr(self, field) for field in self.__slots__}
+
+    def __repr__(self):
+        values = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.__slots__ if getattr(self, field) is not None)
+        return f"Quote({values})"
+
+    def __eq__(self, other):
+        return isinstance(other, Quote) and self.to_dict() == other.to_dict()
+
+NUMBER_PATTERN = re.compile(r'[-+]?\d[\d,]*(?:\.\d+)?')
+
+# 문자열에서 숫자 추출 (예: '71,500원' -> 71500, 'N/A' -> None)
+def parse_number(text, cast=int):
+    if text is None:
+        return None
+    match = NUMBER_PATTERN.search(text.replace('\xa0', ''))
+    if not match:
+        return None
+    value = match.group().replace(',', '')
+    return int(float(value)) if cast is int and '.' in value else cast(value)
+
+# 시가총액을 억원 단위로 (예: '264조 8,460' -> 2648460)
+def parse_market_cap(text):
+    if text is None:
+        return None
+    if '조' in text:
+        trillions, rest = text.split('조', 1)
+        return parse_number(trillions) * 10000 + (parse_number(rest) or 0)
+    return parse_number(text)
+
+# 화면 표시용 변환 함수들 (값이 없으면 N/A)
+def format_won(value):
+    return 'N/A' if value is None else f"{value:,}원"
+
+def format_times(value):
+    return 'N/A' if value is None else f"{value:.2f}배"
+
+def format_percent(value):
+    return 'N/A' if value is None else f"{value:.2f}%"
+
+def format_rate(value):
+    if value is None:
+        return 'N/A'
+    sign = '+' if value > 0 else '-' if value < 0 else ''
+    return f"{sign}{abs(value):.2f}%"
+
+def format_change(quote):
+    label = quote.direction.value if quote.direction else ''
+    if quote.change is None:
+        return label or 'N/A'
+    return f"{abs(quote.change):,}원 {label}".rstrip()
+
+def format_market_cap(value):
+    if value is None:
+        return 'N/A'
+    trillions, rest = divmod(value, 10000)
+    return f"{trillions:,}조 {rest:,}억원" if trillions else f"{rest:,}억원"
+
+# 화면 표시 항목 -> 변환 함수
+QUOTE_DISPLAY = {
+    '종목명' : lambda quote : quote.name or 'N/A',
+    '종목코드' : lambda quote : quote.code or 'N/A',
+    '현재가' : lambda quote : format_won(quote.price),
+    '전일대비' : format_change,
+    '전일비' : format_change,
+    '등락률' : lambda quote : format_rate(quote.change_rate),
+    '전일가' : lambda quote : format_won(quote.prev_close),
+    '고가' : lambda quote : format_won(quote.high),
+    '시가' : lambda quote : format_won(quote.open),
+    '저가' : lambda quote : format_won(quote.low),
+    '거래량' : lambda quote : 'N/A' if quote.volume is None else f"{quote.volume:,}주",
+    '거래대금' : lambda quote : 'N/A' if quote.trading_value is None else f"{quote.trading_value:,}백만",
+    '시가총액' : lambda quote : format_market_cap(quote.market_cap),
+    'PER' : lambda quote : format_times(quote.per),
+    'EPS' : lambda quote : format_won(quote.eps),
+    '추정 PER' : lambda quote : format_times(quote.est_per),
+    '추정 EPS' : lambda quote : format_won(quote.est_eps),
+    'PBR' : lambda quote : format_times(quote.pbr),
+    'BPS' : lambda quote : format_won(quote.bps),
+    '배당수익률' : lambda quote : format_percent(quote.dividend_yield),
+    '외국인소진율' : lambda quote : format_percent(quote.foreign_rate),
+    '동일업종 PER' : lambda quote : format_times(quote.sector_per)
+}
+# 종목 정보 항목 (get_stock_info 결과 순서)
+STOCK_INFO_KEYS = ['현재가', '전일대비', '등락률', '전일가', '고가', '시가', '저가', '거래량', '거래대금',
+                   '시가총액', 'PER', 'EPS', '추정 PER', '추정 EPS', 'PBR', 'BPS', '배당수익률', '외국인소진율', '동일업종 PER']
 
+# 화면 표시용 문자열로 변환 (예: {'현재가' : '71,500원', 'PER' : '12.30배', ...})
+def format_quote(quote, keys=STOCK_INFO_KEYS):
+    return {key : QUOTE_DISPLAY[key](quote) for key in keys}
+
+# 종목 정보 페이지 파싱 (regions가 None이면 문서 전체)
+def parse_quote(html, regions=STOCK_INFO_REGIONS):
+    parser = StockInfoParser()
+    # 페이지에 있는 영역만 골라서 파싱 (NXT 영역은 없는 종목도 있음, 필요한 값이 빠지면 문서 전체)
+    for marker in regions or ():
+        pos = html.find(marker)
+        if pos >= 0:
+            parser.parse_region(html, html.rfind('<', 0, pos))
+    if not parser.regions or parser.label_value('외국인소진율') is None or parser.label_value('동일업종 PER') is None:
+        parser = StockInfoParser()
+        parser.parse_region(html, stop_on_close=False)
+
+    quote = Quote()
+    # nxt 우선, krx 후순위
+    rate_info = parser.regions.get('nxt') if parser.nxt_visible else None
+    rate_info = rate_info or parser.regions.get('krx')
+
+    if rate_info:
         # 현재가
-        if rate_info:
-            info['현재가'] = safe_text(rate_info.select_one('p.no_today span.blind'), '원')
+        quote.price = parse_number(rate_info['today'])
 
         # 전일대비 및 등락률
-        try:
-            if rate_info:
-                diff_em = rate_info.select('p.no_exday em')
-                if len(diff_em) >= 2:
-                    # 전일대비
-                    diff_value = diff_em[0].select_one('span.blind')
-                    diff_dir = diff_em[0].select_one('span.ico')
-                    if diff_value:
-                        diff_text = diff_value.text.strip()
-                        direction = diff_dir.text.strip() if diff_dir else ''
-                        info['전일대비'] = f"{diff_text}원 {direction}" if diff_text else 'N/A'
-                    
-                    # 등락률
-                    rate_value = diff_em[1].select_one('span.blind')
-                    rate_sign = diff_em[1].select_one('span.ico')  # + 또는 - 부호
-                    if rate_value:
-                        sign = rate_sign.text.strip() if rate_sign else ''
-                        value = rate_value.text.strip()
-                        info['등락률'] = f"{sign}{value}%" if value else 'N/A'
-        except Exception as e:
-            print("❌ 전일대비/등락률 가져오기 실패 :", e)
+        diff_em = rate_info['exday']
+        if len(diff_em) >= 2:
+            # 전일대비 (하락이면 음수)
+            if diff_em[0]['blind'] is not None:
+                quote.direction = Direction.from_text(diff_em[0]['ico'])
+                change = parse_number(diff_em[0]['blind'])
+                if change is not None and quote.direction:
+                    change *= quote.direction.sign or 1
+                quote.change = change
+
+            # 등락률 (+ 또는 - 부호)
+            if diff_em[1]['blind'] is not None:
+                rate = parse_number(diff_em[1]['blind'], float)
+                if rate is not None and (diff_em[1]['ico'] or '').strip() == '-':
+                    rate = -rate
+                quote.change_rate = rate
 
         # 시가 / 고가 / 저가 / 거래량 / 거래대금
-        try:
-            label_map = {
-                '전일' : ('전일가', '원'),
-                '고가' : ('고가', '원'),
-                '시가' : ('시가', '원'),
-                '저가' : ('저가', '원'),
-                '거래량' : ('거래량', '주'),
-                '거래대금' : ('거래대금', '백만')
-            }
-
-            if rate_info:
-                for td in rate_info.select('table.no_info td'):
-                    label_span = td.select_one('span.sptxt')
-                    value_em = td.select_one('em span.blind')
-                    if label_span and value_em:
-                        label_text = label_span.text.strip().replace('(', '').replace(')', '')
-                        if label_text in label_map:
-                            key, unit = label_map[label_text]
-                            val = value_em.text.strip().replace(unit, '')
-                            info[key] = val + unit if val else 'N/A'
-        except Exception as e:
-            print("❌ 시세 데이터 가져오기 실패 :", e)
+        label_map = {
+            '전일' : 'prev_close',
+            '고가' : 'high',
+            '시가' : 'open',
+            '저가' : 'low',
+            '거래량' : 'volume',
+            '거래대금' : 'trading_value'
+        }
+        for td in rate_info['no_info']:
+            if td['label'] is not None and td['value'] is not None:
+                label_text = td['label'].strip().replace('(', '').replace(')', '')
+                if label_text in label_map:
+                    setattr(quote, label_map[label_text], parse_number(td['value']))
 
+    # 시가총액
+    quote.market_cap = parse_market_cap(parser.fields.get('_market_sum'))
 
-        # 시가총액
-        try:
-            market_sum = soup.select_one('#_market_sum')
-            if market_sum:
-                parts = market_sum.text.strip().split()
-                info['시가총액'] = ' '.join(parts) + '억원' if len(parts) == 2 else market_sum.text.strip() + '억원'
-        except Exception as e:
-            print("❌ 시가총액 가져오기 실패 :", e)
+    # PER, EPS, 추정 PER, 추정 EPS
+    quote.per = parse_number(parser.fields.get('_per'), float)
+    quote.eps = parse_number(parser.fields.get('_eps'))
+    quote.est_per = parse_number(parser.fields.get('_cns_per'), float)
+    quote.est_eps = parse_number(parser.fields.get('_cns_eps'))
 
-        # PER, EPS
-        try:
-            info['PER'] = safe_text(soup.select_one('em#_per'), '배')
-            info['EPS'] = safe_text(soup.select_one('em#_eps'), '원')
-        except Exception as e:
-            print("❌ PER 또는 EPS 가져오기 실패 :", e)
+    # PBR, BPS
+    if len(parser.pbr_ems) >= 2:
+        quote.pbr = parse_number(parser.pbr_ems[0], float)
+        quote.bps = parse_number(parser.pbr_ems[1])
+    else:
+        print("❌ PBR 또는 BPS 가져오기 실패")
 
-        # 추정 PER, EPS
-        try:
-            info['추정 PER'] = safe_text(soup.select_one('em#_cns_per'), '배')
-            info['추정 EPS'] = safe_text(soup.select_one('em#_cns_eps'), '원')
-        except Exception as e:
-            print("❌ 추정 PER 또는 EPS 가져오기 실패 :", e)
+    # 배당수익률, 외국인소진율, 동일업종 PER
+    for key, field, per_table_only in [('배당수익률', 'dividend_yield', True), ('외국인소진율', 'foreign_rate', False), ('동일업종 PER', 'sector_per', False)]:
+        setattr(quote, field, parse_number(parser.label_value(key, per_table_only), float))
 
-        # PBR, BPS
-        try:
-            pbr_tr = soup.select_one('table.per_table').select('tr')[2]
-            ems = pbr_tr.select('em')
-            pbr_val = ems[0].text.strip().replace('배', '')
-            bps_val = ems[1].text.strip().replace('원', '')
-            info['PBR'] = pbr_val + '배' if pbr_val else 'N/A'
-            info['BPS'] = bps_val + '원' if bps_val else 'N/A'
-        except Exception as e:
-            print("❌ PBR 또는 BPS 가져오기 실패 :", e)
+    return quote
+
+# 종목 정보 페이지 파싱 (화면 표시용 문자열)
+def parse_stock_info(html):
+    return format_quote(parse_quote(html))
+
+# 종목 시세/투자 정보 페이지 주소
+QUOTE_URL = "https://finance.naver.com/item/main.nhn?code={}"
+
+# 종목 시세/투자 정보 가져오기 (네이버 금융, cache=False면 응답 캐시에 남기지 않음)
+def get_quote(stock_code, cache=True):
+    try:
+        text = http_get(QUOTE_URL.format(stock_code), ttl=None if cache else 0)
+        with span('parse'):
+            quote = parse_quote(text)
+        quote.code = stock_code
+        return quote
+
+    except TaskCancelled:
+        raise
+    except Exception as e:
+        print("❌ 전체 페이지 파싱 실패 :", e)
+        return None
+
+# 종목 정보 가져오기 (화면 표시용 문자열)
+def get_stock_info(stock_code):
+    quote = get_quote(stock_code)
+    return format_quote(quote) if quote else None
+
+# 시세 페이지 한 장의 행 수
+PRICE_PAGE_ROWS = 10
+PRICE_DB_PATH = os.path.join(CACHE_DIR, 'prices.db')
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
 
-        # 배당수익률
+_price_db_lock = threading.Lock()
+
+# 로컬 캐시 폴더 변경 (상장 종목 목록, 시세 저장소)
+def set_cache_dir(path):
+    global CACHE_DIR, STOCK_LIST_PATH, PRICE_DB_PATH
+    CACHE_DIR = path
+    STOCK_LIST_PATH = os.path.join(path, 'krx_list.csv')
+    PRICE_DB_PATH = os.path.join(path, 'prices.db')
+
+# 시세 저장소(SQLite) 열기
+def open_price_db():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(PRICE_DB_PATH)
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS prices ('
+        'code TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, volume REAL, '
+        'PRIMARY KEY (code, date))'
+    )
+    return conn
+
+# 저장된 일별 시세 불러오기
+def load_price_history(stock_code):
+    with span('store'), _price_db_lock:
+        conn = open_price_db()
         try:
-            for th in soup.select('table.per_table th'):
-                if '배당수익률' in th.text:
-                    td = th.find_next_sibling('td')
-                    if td:
-                        em = td.find('em')
-                        val = em.text.strip().replace('%', '') if em else ''
-                        info['배당수익률'] = val + '%' if val else 'N/A'
-                    break
-        except Exception as e:
-            print("❌ 배당수익률 가져오기 실패 :", e)
+            rows = conn.execute(
+                'SELECT date, open, high, low, close, volume FROM prices WHERE code = ? ORDER BY date',
+                (stock_code,)
+            ).fetchall()
+        finally:
+            conn.close()
+    df = pd.DataFrame(rows, columns=['Date'] + PRICE_COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.set_index('Date')
 
-        # 외국인소진율
+# 일별 시세 저장 (같은 날짜는 덮어쓰기, replace=True면 기존 이력 삭제 후 저장)
+def save_price_history(stock_code, df, replace=False):
+    rows = [
+        (stock_code, date.strftime('%Y-%m-%d'), *map(float, values))
+        for date, values in zip(df.index, df[PRICE_COLUMNS].itertuples(index=False))
+    ]
+    with span('store'), _price_db_lock:
+        conn = open_price_db()
         try:
-            for th in soup.select('th'):
-                if '외국인소진율' in th.text:
-                    td = th.find_next_sibling('td')
-                    if td:
-                        em = td.find('em')
-                        val = em.text.strip().replace('%', '') if em else ''
-                        info['외국인소진율'] = val + '%' if val else 'N/A'
-                    break
-        except Exception as e:
-            print("❌ 외국인소진율 가져오기 실패 :", e)
+            with conn:
+                if replace:
+                    conn.execute('DELETE FROM prices WHERE code = ?', (stock_code,))
+                conn.executemany('INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+        finally:
+            conn.close()
 
-        # 동일업종 PER
+# 일별 시세 표의 행 (날짜 칸 뒤에 종가, 전일비, 시가, 고가, 저가, 거래량)
+PRICE_ROW_PATTERN = re.compile(r'<tr[^>]*>\s*<td[^>]*>\s*<span[^>]*>\s*(\d{4}\.\d{2}\.\d{2})\s*</span>\s*</td>(.*?)</tr>', re.S)
+PRICE_CELL_PATTERN = re.compile(r'<td[^>]*>(.*?)</td>', re.S)
+TAG_PATTERN = re.compile(r'<[^>]+>')
+# 페이지 이동 링크의 페이지 번호 (맨뒤 링크가 가장 큰 번호)
+PRICE_PAGE_PATTERN = re.compile(r'page=(\d+)')
+# 영업일 중 실제 거래일 비율의 하한 (공휴일을 몰라도 필요한 페이지보다 많이 요청하지 않도록)
+PRICE_TRADING_RATIO = 0.9
+
+# 일별 시세 페이지 파싱 -> (날짜순 OHLCV 표, 마지막 페이지 번호)
+def parse_price_page(html):
+    dates, rows = [], []
+    for date, cells in PRICE_ROW_PATTERN.findall(html):
+        values = [TAG_PATTERN.sub('', cell).strip().replace(',', '') for cell in PRICE_CELL_PATTERN.findall(cells)]
         try:
-            for th in soup.select('th'):
-                if '동일업종 PER' in th.text:
-                    td = th.find_next_sibling('td')
-                    if td:
-                        em = td.find('em')
-                        val = em.text.strip().replace('배', '') if em else ''
-                        info['동일업종 PER'] = val + '배' if val else 'N/A'
-                    break
-        except Exception as e:
-            print("❌ 동일업종 PER 가져오기 실패 :", e)
+            close, _, open_, high, low, volume = values[:6]
+            rows.append((float(open_), float(high), float(low), float(close), float(volume)))
+        except ValueError:
+            continue
+        dates.append(date.replace('.', '-'))
 
-        return info if info else None
+    navi = html.find('class="Nnavi"')
+    pages = PRICE_PAGE_PATTERN.findall(html, navi) if navi >= 0 else []
+    last_page = max(map(int, pages)) if pages else None
 
-    except Exception as e:
-        print("❌ 전체 페이지 파싱 실패 :", e)
+    # 페이지는 최신순이므로 뒤집어서 날짜순으로
+    index = pd.DatetimeIndex(np.array(dates[::-1], dtype='datetime64[ns]'), name='Date')
+    values = np.array(rows[::-1], dtype=float).reshape(len(rows), len(PRICE_COLUMNS))
+    return pd.DataFrame(values, index=index, columns=PRICE_COLUMNS), last_page
+
+# 일별 시세 페이지 주소
+PRICE_PAGE_URL = 'https://finance.naver.com/item/sise_day.nhn?code={}&page={}'
+
+# 일별 시세 한 페이지 크롤링 -> (날짜순 OHLCV 표, 마지막 페이지 번호)
+def fetch_price_page(stock_code, page):
+    text = http_get(PRICE_PAGE_URL.format(stock_code, page))
+    with span('parse'):
+        return parse_price_page(text)
+
+# 페이지별 표(최신 페이지부터)를 하나의 날짜순 OHLCV 테이블로 (배열을 한 번만 할당)
+def build_price_frame(frames):
+    with span('parse'):
+        return _build_price_frame(frames)
+
+def _build_price_frame(frames):
+    frames = [frame for frame in reversed(frames) if len(frame)]
+    if not frames:
+        return pd.DataFrame(columns=PRICE_COLUMNS, index=pd.DatetimeIndex([], name='Date'), dtype=float)
+    dates = np.concatenate([frame.index.values for frame in frames])
+    values = np.concatenate([frame.to_numpy() for frame in frames])
+    # 페이지가 겹치거나(마지막 페이지 반복 등) 순서가 어긋난 경우에만 정리
+    if len(dates) > 1 and not (dates[1:] > dates[:-1]).all():
+        dates, positions = np.unique(dates, return_index=True)
+        values = values[positions]
+    return pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), columns=PRICE_COLUMNS)
+
+# date 이전(포함하지 않음)부터 start까지 필요한 페이지 수 추정 (실제보다 많지 않게)
+def estimate_price_pages(start, date):
+    weekdays = int(np.busday_count(start.date(), date.date()))
+    if weekdays <= 0:
+        return 0
+    return max(1, -(-int(weekdays * PRICE_TRADING_RATIO) // PRICE_PAGE_ROWS))
+
+# end 이후 날짜만 있는 앞쪽 페이지를 건너뛴 첫 페이지 (end 다음 날부터 어제까지 거래일 수의 하한만큼)
+def first_price_page(end, first_page=1):
+    if end is None or first_page != 1:
+        return first_page
+    newer = int(np.busday_count((end + pd.Timedelta(days=1)).date(), pd.Timestamp.today().date()) * PRICE_TRADING_RATIO)
+    return first_page + max(newer, 0) // PRICE_PAGE_ROWS
+
+# 일별 시세를 받을 페이지 순서 (요청은 하지 않음, 동기/비동기 함수 공용)
+# start보다 오래된 날짜가 나오거나, 마지막 페이지 혹은 max_page에 닿으면 멈춤
+# end가 있으면 end 이후 날짜만 있는 앞쪽 페이지는 건너뜀 (페이지 표는 자르지 않고 그대로)
+class PricePagePlan:
+    def __init__(self, start=None, end=None, first_page=1, max_page=None):
+        self.start = pd.Timestamp(start) if start is not None else None
+        self.end = pd.Timestamp(end) if end is not None else None
+        self.first_page = first_page
+        self.max_page = max_page
+        self.page = first_price_page(self.end, first_page)
+        self.last = max_page or float('inf')
+        # 시작 페이지를 찾으며 받은 페이지 -> (표, 마지막 페이지 번호)
+        self.fetched = {}
+
+    # 시작 페이지를 찾을 때 다음에 받아 fetched에 넣을 페이지 (찾았으면 None)
+    # 추정이 지나쳐 end보다 오래된 페이지면 한 페이지씩 앞으로
+    def seek(self):
+        if self.page not in self.fetched:
+            return self.page if self.page != self.first_page else None
+        frame = self.fetched[self.page][0]
+        if self.page > self.first_page and (frame.empty or frame.index[-1] < self.end):
+            self.page -= 1
+            return self.page
         return None
 
-# 일별 시세 테이블 크롤링
-def get_price_table(stock_code, pages=3):
-    dfs = []
-    for page in range(1, pages + 1):
-        url = f'https://finance.naver.com/item/sise_day.nhn?code={stock_code}&page={page}'
-        res = requests.get(url, headers={'User-Agent' : 'Mozilla/5.0'})
-        df = pd.read_html(res.text, header=0)[0]
-        dfs.append(df)
-    df_all = pd.concat(dfs)
-    df_all = df_all.dropna()
-    df_all['날짜'] = pd.to_datetime(df_all['날짜'])
-    df_all = df_all.rename(columns={'날짜' : 'Date', '시가' : 'Open', '고가' : 'High', '저가' : 'Low', '종가' : 'Close', '거래량' : 'Volume'})
-    df_all.set_index('Date', inplace=True)
-    df_all = df_all.sort_index()
-    return df_all
+    # 시작 페이지를 찾으며 이미 받은 페이지 꺼내기 (없으면 None)
+    def take(self, page):
+        return self.fetched.pop(page, None)
 
-# 인기 종목 크롤링
+    # 처음 한 번에 받을 페이지 (날짜 범위 없이 페이지 수만 정해졌으면 전부, 아니면 첫 페이지로 날짜와 마지막 페이지를 확인)
+    def first_pages(self):
+        if self.start is None and self.end is None and self.max_page:
+            return range(self.page, self.max_page + 1)
+        return range(self.page, self.page + 1)
+
+    # 받은 페이지 기록 -> 더 받을 필요가 없으면 True
+    def add(self, page, result):
+        frame, last_page = result
+        self.last = min(self.last, last_page or float('inf'))
+        return frame.empty or page >= self.last or len(frame) < PRICE_PAGE_ROWS or \
+            (self.start is not None and frame.index[0] <= self.start)
+
+    # 다음에 한 번에 요청할 페이지 (start가 있으면 그 날짜까지 필요한 만큼만)
+    def next_pages(self, frame, page):
+        count = self.last - page if self.last != float('inf') else FETCH_WORKERS
+        if self.start is not None:
+            count = min(count, estimate_price_pages(self.start, frame.index[0]))
+        return range(page + 1, page + 1 + max(int(count), 0))
+
+# 일별 시세를 최신 페이지부터 한 페이지씩 (받는 대로 yield, 멈추는 조건은 PricePagePlan)
+def iter_price_pages(stock_code, start=None, end=None, first_page=1, max_page=None):
+    plan = PricePagePlan(start, end, first_page, max_page)
+    executor = None
+
+    def fetch(page):
+        return plan.take(page) or fetch_price_page(stock_code, page)
+
+    # 여러 페이지는 동시에 요청하고 페이지 순서대로 돌려줌
+    def fetch_wave(page_numbers):
+        nonlocal executor
+        if len(page_numbers) == 1:
+            return [fetch(page_numbers[0])]
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        return map_in_context(executor, fetch, page_numbers)
+
+    page = plan.seek()
+    while page is not None:
+        plan.fetched[page] = fetch_price_page(stock_code, page)
+        page = plan.seek()
+
+    page_numbers = plan.first_pages()
+    try:
+        while len(page_numbers):
+            for page, result in zip(page_numbers, fetch_wave(page_numbers)):
+                done = plan.add(page, result)
+                yield result[0]
+                if done:
+                    return
+            page_numbers = plan.next_pages(result[0], page)
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# 페이지 목록 받기 (기본은 iter_price_pages, 비동기 클라이언트는 자신의 함수를 넘김)
+def collect_price_pages(stock_code, **options):
+    return list(iter_price_pages(stock_code, **options))
+
+# 저장된 일별 시세를 최신으로 이어 받고, start(혹은 pages 페이지)만큼 이력이 없으면 더 오래된 페이지를 받아 저장
+def update_price_history(stock_code, start=None, pages=None, fetch_pages=collect_price_pages):
+    start = pd.Timestamp(start) if start is not None else None
+    stored = load_price_history(stock_code)
+    last_date = stored.index[-1] if len(stored) else None
+
+    # 최신 페이지부터 저장된 마지막 날짜와 겹칠 때까지 (페이지 수 제한 없이, 저장된 이력이 없으면 start 혹은 pages까지)
+    max_page = pages if last_date is None else None
+    frames = fetch_pages(stock_code, start=last_date if last_date is not None else start, max_page=max_page)
+    fetched = build_price_frame(frames)
+    overlapped = last_date is not None and not fetched.empty and fetched.index[0] <= last_date
+    # 멈춘 이유가 start, max_page가 아니면 상장 이후 전체를 받은 것
+    reached_end = not frames or (not overlapped and len(frames) != max_page and
+                                 (start is None or fetched.empty or fetched.index[0] > start))
+
+    # 마지막 페이지까지 받았는데도 겹치지 않으면 저장된 이력이 맞지 않으므로 새로 받은 시세로 교체
+    if overlapped:
+        merged = pd.concat([stored[stored.index < fetched.index[0]], fetched])
+    else:
+        merged = fetched
+    if not fetched.empty:
+        save_price_history(stock_code, fetched, replace=not overlapped)
+
+    # 저장된 이력이 부족하면 이어지는 더 오래된 페이지부터
+    short = (start is not None and (merged.empty or estimate_price_pages(start, merged.index[0]) > 0)) or \
+        (pages is not None and len(merged) < pages * PRICE_PAGE_ROWS)
+    first_page = len(merged) // PRICE_PAGE_ROWS + 1
+    if not reached_end and short and not merged.empty and (pages is None or first_page <= pages):
+        older = fetch_pages(stock_code, start=start, first_page=first_page, max_page=pages)
+        backfill = build_price_frame(older)
+        backfill = backfill[backfill.index < merged.index[0]]
+        if not backfill.empty:
+            save_price_history(stock_code, backfill)
+            merged = pd.concat([backfill, merged])
+
+    return merged
+
+# 일별 시세 테이블 크롤링 (저장소에 없는 최신 페이지만 가져오기)
+def get_price_table(stock_code, pages=3, fetch_pages=collect_price_pages):
+    return update_price_history(stock_code, pages=pages, fetch_pages=fetch_pages).tail(pages * PRICE_PAGE_ROWS)
+
+# 기간별 일별 시세 (start ~ end, end가 없으면 오늘까지)
+# 예) get_price_range('005930', pd.Timestamp.today() - pd.DateOffset(months=6))
+def get_price_range(stock_code, start, end=None, fetch_pages=collect_price_pages):
+    start = pd.Timestamp(start)
+    end = pd.Timestamp(end) if end is not None else None
+    # 지난 기간이 이미 저장되어 있으면 요청 없이
+    stored = load_price_history(stock_code)
+    if end is not None and len(stored) and estimate_price_pages(start, stored.index[0]) == 0 and end <= stored.index[-1]:
+        return stored.loc[start:end]
+    return update_price_history(stock_code, start=start, fetch_pages=fetch_pages).loc[start:end]
+
+# 인기 종목 페이지
+POPULAR_URL = 'https://finance.naver.com/sise/nxt_sise_quant.naver'
+# 인기 종목 표의 열
+POPULAR_COLUMNS = ['종목명', '현재가', '전일비', '등락률']
+# 선택할 수 있는 인기 종목 수
+POPULAR_LIMITS = [10, 20, 30, 50, 100]
+
+# 인기 종목 크롤링 (화면 표시용 문자열)
 def get_popular_stock(limit=10):
-    url = 'https://finance.naver.com/sise/nxt_sise_quant.naver'
-    headers = {'User-Agent' : 'Mozilla/5.0'}
-    res = requests.get(url, headers=headers)
-    soup = BeautifulSoup(res.text, 'html.parser')
+    return [format_quote(quote, POPULAR_COLUMNS) for quote in get_popular_quotes(limit)]
+
+# 인기 종목 크롤링
+def get_popular_quotes(limit=10):
+    text = http_get(POPULAR_URL)
+    with span('parse'):
+        return parse_popular_quotes(text, limit)
+
+# 인기 종목 페이지 파싱 (화면 표시용 문자열)
+def parse_popular_stock(html, limit=10):
+    return [format_quote(quote, POPULAR_COLUMNS) for quote in parse_popular_quotes(html, limit)]
+
+# 인기 종목 페이지 파싱
+def parse_popular_quotes(html, limit=10):
+    soup = bs4.BeautifulSoup(html, 'html.parser')
     table = soup.select_one('table.type_2')
     rows = table.select('tr')[2:]
 
-    stocks = []
+    quotes = []
     for row in rows:
         cols = row.select('td')
         if len(cols) < 5:
             continue
         try:
             name = cols[1].text.strip()
-            current = cols[2].text.strip() + '원'
+            current = parse_number(cols[2].text)
 
             # 전일비 금액
             diff_price_tag = cols[3].select_one('span.tah')
-            diff_price = diff_price_tag.text.strip() if diff_price_tag else ''
+            diff_price = parse_number(diff_price_tag.text) if diff_price_tag else None
             # 전일비 방향 (상승/하락)
             direction_tag = cols[3].select_one('span.blind')
-            direction = direction_tag.text.strip() if direction_tag else ''
-            # 등락률
-            rate = cols[4].text.strip()
+            direction = Direction.from_text(direction_tag.text) if direction_tag else None
+            # 등락률 (부호 포함)
+            rate = parse_number(cols[4].text, float)
 
-            # 완성된 전일비
-            diff_full = f"{diff_price}원 {direction}" if diff_price else direction
+            # 하락이면 음수
+            if diff_price is not None and direction:
+                diff_price *= direction.sign or 1
 
-            stocks.append({
-                '종목명' : name,
-                '현재가' : current,
-                '전일비' : diff_full,
-                '등락률' : rate
-            })
+            quotes.append(Quote(name=name, price=current, change=diff_price, change_rate=rate, direction=direction))
 
-            if len(stocks) == limit:
+            if len(quotes) == limit:
                 break
         except Exception as e:
             continue
-    return stocks
+    return quotes
+
+# 이전 목록과 비교해 바뀐 칸만 추림 -> [(행 번호, {열 : 값}, 'up'/'down'/'')]
+def diff_popular_rows(previous, current):
+    previous_prices = {quote.name : quote.price for quote in previous}
+    previous_rows = [format_quote(quote, POPULAR_COLUMNS) for quote in previous]
+    changes = []
+    for index, quote in enumerate(current):
+        before = previous_rows[index] if index < len(previous_rows) else {}
+        row = format_quote(quote, POPULAR_COLUMNS)
+        cells = {column : row[column] for column in POPULAR_COLUMNS if before.get(column) != row[column]}
+        if not cells:
+            continue
+        # 같은 종목의 이전 가격과 비교해 상승/하락 표시
+        old_price = previous_prices.get(quote.name)
+        if old_price is None or quote.price is None or old_price == quote.price:
+            direction = ''
+        else:
+            direction = 'up' if quote.price > old_price else 'down'
+        changes.append((index, cells, direction))
+    return changes
+
+# 비동기 클라이언트 전체 / 호스트별 최대 동시 연결 수
+ASYNC_CONNECTIONS = 64
+ASYNC_HOST_LIMIT = 16
+
+# 비동기 요청용 클라이언트 (연결 풀 하나를 공유, 응답 캐시/통계/속도 제한은 동기 요청과 공용)
+# async with AsyncClient() as client: quotes = await gather_quotes(codes, client)
+class AsyncClient:
+    def __init__(self, limit=ASYNC_CONNECTIONS, limit_per_host=ASYNC_HOST_LIMIT, timeout=FETCH_TIMEOUT):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self.session = None
+        # 주소 -> 진행 중인 요청
+        self._inflight = {}
+
+    async def __aenter__(self):
+        self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    # 세션은 실행 중인 이벤트 루프에서 만들어야 함
+    def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                 headers={'User-Agent' : 'Mozilla/5.0'})
+        return self.session
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    # 공용 GET 요청의 비동기 버전 (캐시, 조건부 요청, 속도 제한, 실패 시 재시도)
+    async def get(self, url, ttl=None):
+        url = resolve_url(url)
+        ttl = http_cache_ttl(url) if ttl is None else ttl
+        text, cached, headers = lookup_http_cache(url, ttl)
+        if text is not None:
+            return text
+
+        # 같은 주소를 동시에 요청하면 한 번만 보내고 결과를 함께 사용
+        task = self._inflight.get(url)
+        if task is None:
+            task = self._inflight[url] = asyncio.ensure_future(self._fetch(url, ttl, cached, headers))
+            task.add_done_callback(lambda _ : self._inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _fetch(self, url, ttl, cached, headers):
+        bucket = get_rate_bucket(urllib.parse.urlsplit(url).netloc)
+        with span('fetch'):
+            for attempt in range(FETCH_RETRIES + 1):
+                while bucket:
+                    wait = bucket.try_acquire()
+                    if not wait:
+                        break
+                    await asyncio.sleep(wait)
+                count_http('requests')
+                try:
+                    async with self.open().get(url, headers=headers) as res:
+                        res.raise_for_status()
+                        body = await res.read()
+                        status, response_headers, encoding = res.status, res.headers, res.get_encoding()
+                    break
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    delay = retry_delay(attempt, e.status if isinstance(e, aiohttp.ClientResponseError) else None)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+
+        return finish_http_response(url, ttl, cached, status, len(body), lambda : body.decode(encoding, errors='replace'),
+                                    response_headers.get('ETag'), response_headers.get('Last-Modified'))
+
+# client가 없으면 이번 호출에서만 쓸 클라이언트 만들기
+@contextlib.asynccontextmanager
+async def client_scope(client=None):
+    if client is not None:
+        yield client
+        return
+    async with AsyncClient() as client:
+        yield client
+
+# get_stock_code의 비동기 버전 (목록을 새로 받아야 할 때만 비동기로 받아 응답 캐시에 넣고, 파싱과 검색은 스레드에서)
+async def async_get_stock_code(stock_name, client=None):
+    if stock_index_stale():
+        async with client_scope(client) as client:
+            try:
+                await client.get(STOCK_LIST_URL)
+            except Exception:
+                # 실패하면 get_stock_code가 기존 목록을 사용하거나 오류를 알림
+                pass
+    return await asyncio.to_thread(get_stock_code, stock_name)
+
+# get_quote의 비동기 버전
+async def async_get_quote(stock_code, client=None):
+    try:
+        async with client_scope(client) as client:
+            text = await client.get(QUOTE_URL.format(stock_code))
+        with span('parse'):
+            quote = parse_quote(text)
+        quote.code = stock_code
+        return quote
+
+    except Exception as e:
+        print("❌ 전체 페이지 파싱 실패 :", e)
+        return None
+
+# get_stock_info의 비동기 버전
+async def async_get_stock_info(stock_code, client=None):
+    quote = await async_get_quote(stock_code, client)
+    return format_quote(quote) if quote else None
+
+# 여러 종목의 Quote를 한 번에 (codes 순서대로, 실패한 종목은 None, 중복된 종목은 한 번만 요청)
+async def gather_quotes(codes, client=None):
+    unique = list(dict.fromkeys(codes))
+    async with client_scope(client) as client:
+        quotes = dict(zip(unique, await asyncio.gather(*(async_get_quote(code, client) for code in unique))))
+    return [quotes[code] for code in codes]
+
+# iter_price_pages의 비동기 버전 (한 번에 요청할 페이지들은 동시에)
+async def async_iter_price_pages(stock_code, start=None, end=None, first_page=1, max_page=None, client=None):
+    plan = PricePagePlan(start, end, first_page, max_page)
+    async with client_scope(client) as client:
+        async def fetch(page):
+            text = await client.get(PRICE_PAGE_URL.format(stock_code, page))
+            with span('parse'):
+                return parse_price_page(text)
+
+        page = plan.seek()
+        while page is not None:
+            plan.fetched[page] = await fetch(page)
+            page = plan.seek()
+
+        page_numbers = plan.first_pages()
+        while len(page_numbers):
+            tasks = {page : asyncio.ensure_future(fetch(page)) for page in page_numbers if page not in plan.fetched}
+            try:
+                for page in page_numbers:
+                    result = plan.take(page) or await tasks[page]
+                    done = plan.add(page, result)
+                    yield result[0]
+                    if done:
+                        return
+            finally:
+                for task in tasks.values():
+                    task.cancel()
+            page_numbers = plan.next_pages(result[0], page)
+
+# 비동기로 받은 페이지를 저장소 갱신(스레드)에 넘겨주는 함수
+def async_price_pages_fetcher(client, loop):
+    async def collect(stock_code, **options):
+        return [frame async for frame in async_iter_price_pages(stock_code, client=client, **options)]
+
+    def fetch_pages(stock_code, **options):
+        return asyncio.run_coroutine_threadsafe(collect(stock_code, **options), loop).result()
+    return fetch_pages
+
+# get_price_table의 비동기 버전 (저장소 읽기/쓰기는 스레드에서, 페이지 요청은 이벤트 루프에서)
+async def async_get_price_table(stock_code, pages=3, client=None):
+    async with client_scope(client) as client:
+        fetch_pages = async_price_pages_fetcher(client, asyncio.get_running_loop())
+        return await asyncio.to_thread(get_price_table, stock_code, pages, fetch_pages)
+
+# get_price_range의 비동기 버전
+async def async_get_price_range(stock_code, start, end=None, client=None):
+    async with client_scope(client) as client:
+        fetch_pages = async_price_pages_fetcher(client, asyncio.get_running_loop())
+        return await asyncio.to_thread(get_price_range, stock_code, start, end, fetch_pages)
+
+# get_popular_quotes의 비동기 버전
+async def async_get_popular_quotes(limit=10, client=None):
+    async with client_scope(client) as client:
+        text = await client.get(POPULAR_URL)
+    with span('parse'):
+        return parse_popular_quotes(text, limit)
+
+# get_popular_stock의 비동기 버전 (화면 표시용 문자열)
+async def async_get_popular_stock(limit=10, client=None):
+    return [format_quote(quote, POPULAR_COLUMNS) for quote in await async_get_popular_quotes(limit, client)]
+
+# 스크리너 동시 조회 수
+SCREENER_WORKERS = FETCH_WORKERS
+# 스크리너 스냅샷 열 (Quote 필드)
+SCREENER_FIELDS = ['code', 'name', 'direction'] + QUOTE_INT_FIELDS + QUOTE_FLOAT_FIELDS
+# 조건식/정렬에서 쓸 수 있는 한글 이름 -> 열 이름
+SCREENER_ALIASES = {
+    '종목명' : 'name',
+    '종목코드' : 'code',
+    '현재가' : 'price',
+    '전일대비' : 'change',
+    '등락률' : 'change_rate',
+    '거래량' : 'volume',
+    '거래대금' : 'trading_value',
+    '시가총액' : 'market_cap',
+    '추정 PER' : 'est_per',
+    '추정 EPS' : 'est_eps',
+    '동일업종 PER' : 'sector_per',
+    'PER' : 'per',
+    'EPS' : 'eps',
+    'PBR' : 'pbr',
+    'BPS' : 'bps',
+    '배당수익률' : 'dividend_yield',
+    '외국인소진율' : 'foreign_rate'
+}
+SCREENER_PATTERN = re.compile(r'screener_(\d{8})\.csv$')
+
+_screener_cache = {}
+_screener_cache_lock = threading.Lock()
+
+# 날짜별 스크리너 스냅샷 경로 (기본값은 오늘)
+def screener_snapshot_path(date=None):
+    date = date or datetime.datetime.now(KST).strftime('%Y%m%d')
+    return os.path.join(CACHE_DIR, f'screener_{date}.csv')
+
+# 가장 최근 스크리너 스냅샷 경로 (없으면 None)
+def latest_screener_snapshot():
+    if not os.path.isdir(CACHE_DIR):
+        return None
+    names = sorted(name for name in os.listdir(CACHE_DIR) if SCREENER_PATTERN.match(name))
+    return os.path.join(CACHE_DIR, names[-1]) if names else None
+
+# 스냅샷에 이미 저장된 종목 코드
+def read_screener_codes(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='', encoding='utf-8') as f:
+        return {row['code'] for row in csv.DictReader(f) if row.get('code')}
+
+# 전체 상장 종목의 투자 정보를 모아 오늘 스냅샷에 저장
+# (중단되어도 이미 저장된 종목은 건너뛰고 이어서 수집)
+def build_screener_snapshot(workers=SCREENER_WORKERS, date=None, progress=None, cancelled=None):
+    path = screener_snapshot_path(date)
+    listing = load_stock_list()
+    saved = read_screener_codes(path)
+    todo = [(name, code) for name, code in zip(listing['회사명'], listing['종목코드']) if code not in saved]
+    total, done, failed = len(listing), len(listing) - len(todo), 0
+    if progress:
+        progress(done, total, failed)
+    if not todo:
+        return path
+
+    # 전체 종목의 페이지가 응답 캐시를 채우지 않도록 캐시 없이
+    def fetch(item):
+        name, code = item
+        quote = get_quote(code, cache=False)
+        if quote:
+            quote.name = name
+        return quote
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    new_file = not os.path.exists(path)
+    workers = max(1, workers)
+    with open(path, 'a', newline='', encoding='utf-8') as f, \
+            ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pystock-screener') as executor:
+        writer = csv.DictWriter(f, fieldnames=SCREENER_FIELDS)
+        if new_file:
+            writer.writeheader()
+        items = iter(todo)
+        running = set()
+        while True:
+            # 대기 중인 요청은 스레드 수의 2배까지만
+            while len(running) < workers * 2 and not (cancelled and cancelled()):
+                item = next(items, None)
+                if item is None:
+                    break
+                running.add(executor.submit(fetch, item))
+            if not running:
+                break
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                quote = future.result()
+                if quote is None:
+                    failed += 1
+                    continue
+                row = quote.to_dict()
+                row['direction'] = quote.direction.value if quote.direction else None
+                writer.writerow(row)
+                done += 1
+            f.flush()
+            if progress:
+                progress(done, total, failed)
+    check_cancelled(cancelled)
+    return path
+
+# 스냅샷 불러오기 (파일이 바뀌지 않았으면 메모리에서)
+def load_screener_snapshot(path):
+    mtime = os.path.getmtime(path)
+    with _screener_cache_lock:
+        cached = _screener_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    df = pd.read_csv(path, dtype={'code' : str, 'name' : str, 'direction' : str}, encoding='utf-8')
+    df = df.drop_duplicates('code', keep='last').reset_index(drop=True)
+    df[QUOTE_INT_FIELDS] = df[QUOTE_INT_FIELDS].astype('Int64')
+    df[QUOTE_FLOAT_FIELDS] = df[QUOTE_FLOAT_FIELDS].astype(float)
+    with _screener_cache_lock:
+        _screener_cache[path] = (mtime, df)
+    return df
+
+# 조건식 안의 따옴표 문자열 (항목 이름이나 %를 바꾸지 않음)
+SCREENER_STRING_PATTERN = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')''')
+
+# 한글 이름이 들어간 조건식을 열 이름으로 변환 (예: 'PER < 10 and 배당수익률 > 3%' -> 'per < 10 and dividend_yield > 3')
+def translate_screener_query(query):
+    # 나눈 조각 중 홀수 번째는 따옴표 문자열
+    parts = SCREENER_STRING_PATTERN.split(query)
+    for i in range(0, len(parts), 2):
+        part = parts[i]
+        for alias in sorted(SCREENER_ALIASES, key=len, reverse=True):
+            part = part.replace(alias, SCREENER_ALIASES[alias])
+        parts[i] = re.sub(r'(\d)\s*%', r'\1', part)
+    return ''.join(parts)
+
+# 스냅샷에서 조건에 맞는 종목 찾기 (값이 없는 종목은 조건에서 제외)
+def screen(query=None, sort=None, ascending=True, limit=None, path=None):
+    path = path or latest_screener_snapshot()
+    if path is None:
+        raise FileNotFoundError("스크리너 스냅샷이 없습니다. 먼저 수집해 주세요.")
+    df = load_screener_snapshot(path)
+    if query:
+        mask = df.eval(translate_screener_query(query), engine='python')
+        df = df[mask.fillna(False).astype(bool)]
+    if sort:
+        df = df.sort_values(SCREENER_ALIASES.get(sort, sort), ascending=ascending, na_position='last')
+    return df.head(limit) if limit else df
+
+# 표(DataFrame)를 Quote 목록으로 (화면 표시용)
+def frame_to_quotes(df):
+    fields = [field for field in Quote.__slots__ if field in df.columns]
+    quotes = []
+    for row in df[fields].itertuples(index=False):
+        values = {field : None if pd.isna(value) else value for field, value in zip(fields, row)}
+        for field in QUOTE_INT_FIELDS:
+            if values.get(field) is not None:
+                values[field] = int(values[field])
+        if values.get('direction') is not None:
+            values['direction'] = Direction.from_text(str(values['direction']))
+        quotes.append(Quote(**values))
+    return quotes
+
+# 차트 이미지 캐시 크기
+CHART_CACHE_SIZE = 32
+# 차트를 그리는 프로세스 수 (0이면 현재 프로세스에서 그리기, 비교 창의 두 차트를 동시에 그릴 수 있도록 2개)
+CHART_WORKERS = min(2, os.cpu_count() or 1)
+# 기본 그림 크기 (인치)와 해상도, 봉 하나에 필요한 최소 픽셀 수
+CHART_SIZE = (8, 5.75)
+CHART_DPI = 100
+CHART_BAR_PIXELS = 3
+
+_chart_style = None
+_chart_cache = OrderedDict()
+_chart_cache_lock = threading.Lock()
+# matplotlib는 여러 스레드에서 동시에 그릴 수 없음
+_chart_render_lock = threading.Lock()
+# 차트 프로세스 풀 (None : 아직 없음, False : 사용할 수 없음)
+_chart_pool = None
+_chart_pool_lock = threading.Lock()
+
+# 캔들차트 스타일 (한 번만 생성)
+def get_chart_style():
+    global _chart_style
+    if _chart_style is None:
+        mc = mpf.make_marketcolors(up='red', down='blue', edge='inherit', wick='gray', volume='inherit')
+        _chart_style = mpf.make_mpf_style(marketcolors=mc, gridstyle='--')
+    return _chart_style
+
+# 차트 프로세스 시작 시 matplotlib, 글꼴, 스타일을 미리 준비
+def _init_chart_worker():
+    use_agg_backend()
+    set_korean_font()
+    get_chart_style()
+
+def _chart_worker_ready():
+    return os.getpid()
+
+# 차트 프로세스 풀 (화면이 있는 프로세스를 복제하지 않도록 spawn으로 시작)
+def get_chart_pool():
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None and CHART_WORKERS > 0:
+            try:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                _chart_pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                                                  initializer=_init_chart_worker)
+            except Exception as e:
+                print(f"❌ 차트 프로세스 시작 실패 (현재 프로세스에서 그림) : {e}")
+                _chart_pool = False
+        return _chart_pool or None
+
+# 차트 프로세스를 미리 띄워 첫 차트가 matplotlib import를 기다리지 않도록
+def start_chart_pool():
+    pool = get_chart_pool()
+    if pool is not None:
+        for _ in range(CHART_WORKERS):
+            pool.submit(_chart_worker_ready)
+
+# 차트 프로세스 종료 (그리던 차트는 버림)
+def shutdown_chart_pool():
+    global _chart_pool
+    with _chart_pool_lock:
+        pool, _chart_pool = _chart_pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# 차트 프로세스에서 그려 PNG 바이트 받기 (프로세스가 죽으면 현재 프로세스에서)
+def render_chart(fn, *args):
+    global _chart_pool
+    with span('plot'):
+        pool = get_chart_pool()
+        if pool is not None:
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenExecutor as e:
+                print(f"❌ 차트 프로세스 오류 (현재 프로세스에서 그림) : {e}")
+                with _chart_pool_lock:
+                    _chart_pool = False
+        return fn(*args)
+
+# 그림 폭에 그릴 수 있는 최대 봉 수
+def max_chart_bars(size=None):
+    width = (size or CHART_SIZE)[0] * CHART_DPI
+    return max(1, int(width // CHART_BAR_PIXELS))
+
+# 구간 시작 위치별로 OHLCV 묶기 (시가/종가는 처음/마지막, 고가/저가는 최대/최소)
+def reduce_ohlcv(values, starts, index):
+    ends = np.r_[starts[1:], len(values)] - 1
+    return pd.DataFrame({
+        'Open' : values[starts, 0],
+        'High' : np.maximum.reduceat(values[:, 1], starts),
+        'Low' : np.minimum.reduceat(values[:, 2], starts),
+        'Close' : values[ends, 3],
+        'Volume' : np.add.reduceat(values[:, 4], starts)
+    }, index=index)
+
+# 봉이 그림 폭보다 많으면 이웃한 봉을 묶어 줄이기 (고가/저가의 극값은 그대로 유지)
+# 최신 봉이 온전한 묶음이 되도록 끝에서부터 묶고, 보조지표는 묶음의 마지막 값 사용
+def downsample_ohlcv(df, max_bars, specs=None):
+    if len(df) <= max_bars:
+        return df, specs
+    step = -(-len(df) // max_bars)
+    starts = np.unique(np.r_[0, np.arange(len(df) % step, len(df), step)])
+    ends = np.r_[starts[1:], len(df)] - 1
+    values = df[PRICE_COLUMNS].to_numpy(dtype=float)
+    sampled = reduce_ohlcv(values, starts, df.index[ends])
+    if specs:
+        specs = [dict(spec, data=spec['data'].iloc[ends]) for spec in specs]
+    return sampled, specs
+
+def _draw_candle_chart(df, size=None, specs=None):
+    buf = io.BytesIO()
+    options = {'figsize' : size} if size else {}
+    if specs:
+        options['addplot'] = [mpf.make_addplot(spec['data'], **{k : v for k, v in spec.items() if k != 'data'}) for spec in specs]
+    with _chart_render_lock:
+        mpf.plot(df, type='candle', style=get_chart_style(), volume=True, savefig=dict(fname=buf, format='png'), **options)
+    return buf.getvalue()
+
+# 캔들차트를 PNG 바이트로 그리기 (파일 저장 없음, specs는 indicator_plot_specs 결과)
+def render_candle_chart(df, size=None, specs=None):
+    df, specs = downsample_ohlcv(df, max_chart_bars(size), specs)
+    return render_chart(_draw_candle_chart, df, size, specs)
 
 # 캔들차트 이미지로 저장
 def plot_candle_chart(df, filename='chart.png'):
-    mc = mpf.make_marketcolors(up='red', down='blue', edge='inherit', wick='gray', volume='inherit')
-    s = mpf.make_mpf_style(marketcolors=mc, gridstyle='--')
-    mpf.plot(df, type='candle', style=s, volume=True, savefig=filename)
+    with open(filename, 'wb') as f:
+        f.write(render_candle_chart(df))
+
+# 캔들차트 이미지 가져오기 (종목코드, 주기, 마지막 봉, 크기, 보조지표 기준으로 캐시)
+def get_chart_image(stock_code, period, df, size=None, indicators=()):
+    last_bar = (df.index[-1], df['Close'].iloc[-1]) if len(df) else None
+    indicators = tuple(name for name in INDICATORS if name in indicators)
+    key = (stock_code, period, last_bar, size, indicators)
+    with _chart_cache_lock:
+        if key in _chart_cache:
+            _chart_cache.move_to_end(key)
+            return _chart_cache[key]
+
+    specs = indicator_plot_specs(get_period_indicators(stock_code, period, df), indicators) if indicators else None
+    img = render_candle_chart(df, size, specs)
+    with _chart_cache_lock:
+        _chart_cache[key] = img
+        while len(_chart_cache) > CHART_CACHE_SIZE:
+            _chart_cache.popitem(last=False)
+    return img
+
+# 차트에 한글을 표시할 수 있는 글꼴
+KOREAN_FONTS = ['Malgun Gothic', 'AppleGothic', 'NanumGothic', 'Noto Sans CJK KR', 'Noto Sans KR']
+
+_korean_font_ready = False
+
+# 설치된 한글 글꼴이 있으면 차트 글꼴로 사용
+def set_korean_font():
+    global _korean_font_ready
+    if _korean_font_ready:
+        return
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    for name in KOREAN_FONTS:
+        if name in installed:
+            plt.rcParams['font.family'] = name
+            break
+    plt.rcParams['axes.unicode_minus'] = False
+    _korean_font_ready = True
+
+# 종가를 공통 날짜 기준으로 맞추고 첫날 대비 수익률(%)로 변환
+def rebase_returns(frames):
+    if not frames:
+        return pd.DataFrame()
+    closes = pd.concat({name : df['Close'] for name, df in frames.items()}, axis=1, join='inner').dropna()
+    if closes.empty:
+        return closes
+    return (closes / closes.iloc[0] - 1) * 100
+
+def _draw_compare_chart(rebased, size=CHART_SIZE):
+    buf = io.BytesIO()
+    with _chart_render_lock:
+        set_korean_font()
+        fig, ax = plt.subplots(figsize=size)
+        try:
+            for name in rebased.columns:
+                ax.plot(rebased.index, rebased[name], label=name, linewidth=1.5)
+            ax.axhline(0, color='gray', linewidth=0.8)
+            ax.set_ylabel('수익률 (%)')
+            ax.grid(linestyle='--', alpha=0.5)
+            ax.legend(loc='upper left')
+            fig.autofmt_xdate()
+            fig.savefig(buf, format='png')
+        finally:
+            plt.close(fig)
+    return buf.getvalue()
+
+# 수익률 비교 차트를 PNG 바이트로 그리기
+def render_compare_chart(rebased, size=CHART_SIZE):
+    return render_chart(_draw_compare_chart, rebased, size)
+
+# 주기별로 보여줄 시세 페이지 수 (주봉, 월봉은 이 기간의 일봉으로 만듦, 처음 볼 때 필요한 만큼만 받음)
+PERIOD_PAGES = {'D' : 3, 'W' : 15, 'M' : 60}
+# 메모리에 보관한 일봉을 다시 확인하는 간격 (초)
+PRICE_REFRESH_TTL = 60
+
+_timeframes = {}
+_timeframes_lock = threading.Lock()
+
+# 날짜별 주봉(일요일), 월봉(말일) 구간 날짜
+def bucket_dates(index, rule):
+    days = index.values.astype('datetime64[D]')
+    if rule == 'W':
+        # 1970-01-01은 목요일 (월요일 = 0)
+        weekday = (days.astype('int64') + 3) % 7
+        return days + (6 - weekday)
+    return (days.astype('datetime64[M]') + 1).astype('datetime64[D]') - 1
+
+# 일봉을 주봉 혹은 월봉으로 집계 (날짜순으로 정렬된 일봉 기준)
+def aggregate_ohlcv(df, rule):
+    with span('resample'):
+        return _aggregate_ohlcv(df, rule)
+
+def _aggregate_ohlcv(df, rule):
+    if df.empty:
+        return df[PRICE_COLUMNS].copy()
+    buckets = bucket_dates(df.index, rule)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    values = df[PRICE_COLUMNS].to_numpy(dtype=float)
+    return reduce_ohlcv(values, starts, pd.DatetimeIndex(buckets[starts], name='Date'))
+
+# 새 일봉이 들어왔을 때 마지막(열린) 구간부터만 다시 집계
+def update_aggregate(agg, df, rule):
+    if agg is None or agg.empty:
+        return aggregate_ohlcv(df, rule)
+    last_bucket = agg.index[-1].to_datetime64().astype('datetime64[D]')
+    start = np.searchsorted(bucket_dates(df.index, rule), last_bucket, side='left')
+    return pd.concat([agg.iloc[:-1], aggregate_ohlcv(df.iloc[start:], rule)])
 
 # 캔들차트 재구성
 def resample_ohlcv(df, rule='W'):
-    ohlcv = {
-        'Open' : 'first',
-        'High' : 'max',
-        'Low' : 'min',
-        'Close' : 'last',
-        'Volume' : 'sum'
-    }
-    return df.resample(rule).apply(ohlcv).dropna()
+    return aggregate_ohlcv(df.sort_index(), rule)
+
+# new가 old 뒤에 봉만 더 붙은 시세인지 확인 (old의 마지막 봉은 장중에 바뀔 수 있음)
+def extends_prices(old, new):
+    count = len(old)
+    if count == 0 or len(new) < count or not new.index[:count].equals(old.index):
+        return False
+    return np.array_equal(new[PRICE_COLUMNS].to_numpy()[:count - 1], old[PRICE_COLUMNS].to_numpy()[:count - 1])
+
+# 종목의 일봉(저장소의 전체 이력)과 주봉/월봉 갱신 (새 봉만 붙었으면 마지막 구간부터, 앞쪽 이력이 바뀌면 전체 재집계)
+def update_timeframes(stock_code, daily, pages):
+    with _timeframes_lock:
+        entry = _timeframes.get(stock_code)
+        incremental = entry is not None and extends_prices(entry['D'], daily)
+        entry = {
+            'D' : daily,
+            'W' : update_aggregate(entry['W'], daily, 'W') if incremental else aggregate_ohlcv(daily, 'W'),
+            'M' : update_aggregate(entry['M'], daily, 'M') if incremental else aggregate_ohlcv(daily, 'M'),
+            # 보조지표는 처음 요청할 때 이전 결과에 이어서 계산
+            'indicators' : entry['indicators'] if entry else {},
+            # 이력을 확인한 페이지 수 (더 긴 주기를 처음 볼 때만 이전 페이지를 이어 받음)
+            'pages' : max(pages, entry['pages']) if incremental else pages,
+            'updated_at' : time.time()
+        }
+        _timeframes[stock_code] = entry
+        return entry
+
+# 주기별 시세 테이블 (일봉은 주기에 필요한 페이지만 가져오고 주봉/월봉은 메모리에서 집계)
+def get_period_table(stock_code, period='D', refresh=True):
+    pages = PERIOD_PAGES[period]
+    with _timeframes_lock:
+        entry = _timeframes.get(stock_code)
+    expired = entry is None or (refresh and time.time() - entry['updated_at'] >= PRICE_REFRESH_TTL)
+    # 갱신할 때는 최신 페이지만, 보관한 이력보다 긴 주기를 처음 볼 때는 이전 페이지를 이어 받음
+    if expired or entry['pages'] < pages:
+        daily = run_shared(('prices', stock_code, pages), lambda : update_price_history(stock_code, pages=pages))
+        entry = update_timeframes(stock_code, daily, pages)
+
+    daily = entry['D']
+    rows = PERIOD_PAGES[period] * PRICE_PAGE_ROWS
+    if period == 'D' or daily.empty:
+        return daily.tail(rows)
+    # 해당 기간의 일봉이 포함된 구간만
+    first_bucket = bucket_dates(daily.index[-rows:][:1], period)[0]
+    agg = entry[period]
+    return agg[agg.index >= pd.Timestamp(first_bucket)]
+
+# 보조지표 (이름 -> 표시 이름)
+INDICATORS = {'MA' : '이동평균', 'EMA' : '지수이동평균', 'BB' : '볼린저밴드', 'RSI' : 'RSI', 'MACD' : 'MACD'}
+# 보조지표 기간
+MA_WINDOWS = (5, 20, 60)
+EMA_SPAN = 20
+BB_WINDOW, BB_WIDTH = 20, 2
+RSI_PERIOD = 14
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+# 보조지표 표의 열 (밑줄로 시작하는 열은 이어서 계산할 때 쓰는 중간값)
+INDICATOR_COLUMNS = ['close'] + [f'ma{window}' for window in MA_WINDOWS] + \
+    ['bb_upper', 'bb_lower', 'ema', '_gain', '_loss', 'rsi', '_ema_fast', '_ema_slow', 'macd', 'macd_signal', 'macd_hist']
+# 이동평균/볼린저밴드를 이어서 계산할 때 앞에 붙일 봉 수
+INDICATOR_WARMUP = max(MA_WINDOWS + (BB_WINDOW, RSI_PERIOD + 1))
+# 이어서 계산하려면 직전 봉에 RSI 첫 기간 평균이 있어야 함 (이보다 앞에서 바뀌면 전체 재계산)
+INDICATOR_SEED_MIN = RSI_PERIOD + 1
+
+# 지수이동평균 (seed가 있으면 직전 값에 이어서 계산)
+def ewm_mean(values, alpha, seed=None):
+    if seed is None:
+        return pd.Series(values).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    # 이어서 계산할 때는 새 봉 몇 개뿐이므로 점화식으로 바로 계산
+    result = np.empty(len(values))
+    last = seed
+    for i, value in enumerate(values):
+        last = (1 - alpha) * last + alpha * value
+        result[i] = last
+    return result
+
+# 이동 구간 평균/표준편차 (구간이 차지 않은 앞부분은 NaN)
+def rolling_stat(values, window, stat='mean'):
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        result[window - 1:] = windows.mean(axis=1) if stat == 'mean' else windows.std(axis=1)
+    return result
+
+# 보조지표 계산 (previous가 있으면 값이 바뀐 봉부터만 다시 계산)
+def compute_indicators(bars, previous=None):
+    with span('indicators'):
+        return _compute_indicators(bars, previous)
+
+def _compute_indicators(bars, previous):
+    close = bars['Close'].to_numpy(dtype=float)
+    start = 0
+    if previous is not None and len(previous) and len(close) and previous.index[0] == bars.index[0]:
+        common = min(len(previous), len(close))
+        same = (previous.index.asi8[:common] == bars.index.asi8[:common]) & (previous['close'].to_numpy()[:common] == close[:common])
+        start = common if same.all() else int(np.argmin(same))
+        if start == len(close):
+            return previous if start == len(previous) else previous.iloc[:start]
+        if start < INDICATOR_SEED_MIN:
+            start = 0
+
+    new = close[start:]
+    count = len(new)
+    seed = dict(zip(INDICATOR_COLUMNS, previous.to_numpy()[start - 1])) if start else None
+    columns = {'close' : new}
+
+    # 이동평균, 볼린저밴드 (앞쪽 봉을 붙여서 계산한 뒤 새 봉만)
+    history = close[max(0, start - INDICATOR_WARMUP):]
+    for window in MA_WINDOWS:
+        columns[f'ma{window}'] = rolling_stat(history, window)[-count:]
+    middle = rolling_stat(history, BB_WINDOW)[-count:]
+    deviation = rolling_stat(history, BB_WINDOW, 'std')[-count:]
+    columns['bb_upper'] = middle + BB_WIDTH * deviation
+    columns['bb_lower'] = middle - BB_WIDTH * deviation
+
+    # 지수이동평균
+    columns['ema'] = ewm_mean(new, 2 / (EMA_SPAN + 1), None if seed is None else seed['ema'])
+
+    # RSI (Wilder : 처음 기간은 단순평균, 이후 1/기간 비율로 평활)
+    delta = np.diff(close[start - 1:]) if start else np.r_[np.nan, np.diff(close)]
+    gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+    if seed is None:
+        for values in (gain, loss):
+            if len(values) > RSI_PERIOD:
+                values[RSI_PERIOD] = values[1:RSI_PERIOD + 1].mean()
+            values[:min(RSI_PERIOD, len(values))] = np.nan
+    columns['_gain'] = ewm_mean(gain, 1 / RSI_PERIOD, None if seed is None else seed['_gain'])
+    columns['_loss'] = ewm_mean(loss, 1 / RSI_PERIOD, None if seed is None else seed['_loss'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['rsi'] = 100 - 100 / (1 + columns['_gain'] / columns['_loss'])
+
+    # MACD
+    columns['_ema_fast'] = ewm_mean(new, 2 / (MACD_FAST + 1), None if seed is None else seed['_ema_fast'])
+    columns['_ema_slow'] = ewm_mean(new, 2 / (MACD_SLOW + 1), None if seed is None else seed['_ema_slow'])
+    columns['macd'] = columns['_ema_fast'] - columns['_ema_slow']
+    columns['macd_signal'] = ewm_mean(columns['macd'], 2 / (MACD_SIGNAL + 1), None if seed is None else seed['macd_signal'])
+    columns['macd_hist'] = columns['macd'] - columns['macd_signal']
+
+    # 열마다 따로 만들지 않고 한 덩어리 배열로
+    block = np.column_stack([columns[column] for column in INDICATOR_COLUMNS])
+    if start:
+        block = np.vstack([previous.to_numpy()[:start], block])
+    return pd.DataFrame(block, index=bars.index, columns=INDICATOR_COLUMNS)
+
+# 주기별 보조지표 (종목별로 보관하며 새 봉이 들어오면 이어서 계산)
+def get_period_indicators(stock_code, period, df):
+    with _timeframes_lock:
+        entry = _timeframes.get(stock_code)
+    if entry is None or entry[period].empty or not df.index.isin(entry[period].index).all():
+        return compute_indicators(df).reindex(df.index)
+
+    frame = compute_indicators(entry[period], entry['indicators'].get(period))
+    with _timeframes_lock:
+        entry['indicators'][period] = frame
+    return frame.reindex(df.index)
+
+# 보조지표를 차트에 겹쳐 그릴 항목 (mplfinance addplot 인자, 거래량은 1번 패널)
+def indicator_plot_specs(indicators, names):
+    specs = []
+    if 'MA' in names:
+        for window, color in zip(MA_WINDOWS, ['#f39c12', '#27ae60', '#8e44ad']):
+            specs.append({'data' : indicators[f'ma{window}'], 'panel' : 0, 'color' : color, 'width' : 0.8})
+    if 'EMA' in names:
+        specs.append({'data' : indicators['ema'], 'panel' : 0, 'color' : '#16a085', 'width' : 0.8})
+    if 'BB' in names:
+        for column in ('bb_upper', 'bb_lower'):
+            specs.append({'data' : indicators[column], 'panel' : 0, 'color' : 'gray', 'linestyle' : '--', 'width' : 0.7})
+    # 아래쪽 패널 (패널마다 함께 그릴 항목)
+    panels = []
+    if 'RSI' in names:
+        panels.append([{'data' : indicators['rsi'], 'color' : '#8e44ad', 'width' : 1, 'ylabel' : 'RSI', 'ylim' : (0, 100)}])
+    if 'MACD' in names:
+        panels.append([
+            {'data' : indicators['macd'], 'color' : '#2c3e50', 'width' : 1, 'ylabel' : 'MACD'},
+            {'data' : indicators['macd_signal'], 'color' : '#e67e22', 'width' : 1},
+            {'data' : indicators['macd_hist'], 'type' : 'bar', 'color' : 'gray'}
+        ])
+
+    # 값이 하나도 없는 항목은 그릴 수 없으므로 먼저 빼고, 남은 패널에 2번부터 차례로 번호 (빈 번호가 있으면 mplfinance 오류)
+    has_data = lambda spec : spec['data'].notna().any()
+    specs = [spec for spec in specs if has_data(spec)]
+    panel = 2
+    for group in panels:
+        group = [spec for spec in group if has_data(spec)]
+        if group:
+            specs.extend(dict(spec, panel=panel) for spec in group)
+            panel += 1
+    return specs
+
+# 화면 작업용 스레드 수
+GUI_WORKERS = 4
+# 작업이 끝났을 때 창으로 보내는 이벤트
+TASK_DONE_EVENT = '-TASK-DONE-'
+
+_gui_executor = None
+_gui_executor_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+# 화면 작업이 진행 중인 수 (미리 불러오기는 화면 작업이 없을 때만 진행)
+_foreground = 0
+_foreground_idle = threading.Event()
+_foreground_idle.set()
+_foreground_lock = threading.Lock()
+
+# 더 최신 요청이 들어와 필요 없어진 작업
+class TaskCancelled(Exception):
+    pass
+
+# 화면 작업용 스레드 풀
+def get_gui_executor():
+    global _gui_executor
+    with _gui_executor_lock:
+        if _gui_executor is None:
+            _gui_executor = ThreadPoolExecutor(max_workers=GUI_WORKERS, thread_name_prefix='pystock')
+        return _gui_executor
+
+# 같은 작업이 이미 진행 중이면 새로 요청하지 않고 그 결과를 함께 기다림
+def run_shared(key, fn, *args):
+    with _inflight_lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        try:
+            return future.result()
+        except TaskCancelled:
+            # 함께 기다리던 작업(미리 불러오기 등)이 취소되었으면 직접 다시 요청
+            return run_shared(key, fn, *args)
+
+    try:
+        result = fn(*args)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+# 화면 작업 시작/종료 표시
+@contextlib.contextmanager
+def foreground():
+    global _foreground
+    with _foreground_lock:
+        _foreground += 1
+        _foreground_idle.clear()
+    try:
+        yield
+    finally:
+        with _foreground_lock:
+            _foreground -= 1
+            if _foreground == 0:
+                _foreground_idle.set()
+
+# 창 하나의 백그라운드 작업 관리 (작업 종류별로 가장 최근 요청의 결과만 반영)
+class BackgroundTasks:
+    def __init__(self, window, name='task'):
+        self.window = window
+        self.name = name
+        self.closed = False
+        self._generation = {}
+        self._futures = {}
+        self._pending = set()
+
+    # 작업 시작 (같은 종류의 이전 작업은 취소)
+    def submit(self, slot, fn, *args):
+        generation = self._generation.get(slot, 0) + 1
+        self._generation[slot] = generation
+        self._pending.add(slot)
+        previous = self._futures.get(slot)
+        if previous:
+            previous.cancel()
+        cancelled = lambda : self.is_stale(slot, generation)
+        self._futures[slot] = get_gui_executor().submit(self._run, slot, generation, fn, args, cancelled)
+
+    def _run(self, slot, generation, fn, args, cancelled):
+        if cancelled():
+            return
+        with foreground(), traced(f'{self.name} {slot}') as trace:
+            try:
+                result, error = fn(*args, cancelled=cancelled), None
+            except TaskCancelled:
+                return
+            except Exception as e:
+                result, error = None, e
+        if cancelled():
+            return
+        try:
+            self.window.write_event_value(TASK_DONE_EVENT, (slot, generation, result, error, trace))
+        except Exception:
+            # 창이 이미 닫힌 경우
+            pass
+
+    # 더 최신 요청이 있거나 창이 닫혔는지 확인
+    def is_stale(self, slot, generation):
+        return self.closed or self._generation.get(slot) != generation
+
+    # 완료 이벤트 확인 (최신 요청의 결과일 때만 True)
+    def accept(self, slot, generation):
+        if self.is_stale(slot, generation):
+            return False
+        self._pending.discard(slot)
+        return True
+
+    # 결과를 기다리는 작업이 있는지 확인
+    def busy(self):
+        return bool(self._pending)
+
+    # 작업 취소 (진행 중인 작업은 다음 확인 시점에 중단)
+    def cancel(self, slot):
+        self._generation[slot] = self._generation.get(slot, 0) + 1
+        self._pending.discard(slot)
+        future = self._futures.pop(slot, None)
+        if future:
+            future.cancel()
+
+    # 창을 닫을 때 남은 작업 취소
+    def close(self):
+        self.closed = True
+        for future in self._futures.values():
+            future.cancel()
+
+# 취소 여부 확인
+def check_cancelled(cancelled):
+    if cancelled and cancelled():
+        raise TaskCancelled()
+
+# 보조지표 선택 체크박스 (창마다 따로 선택)
+def indicator_checkboxes():
+    return [sg.Checkbox(label, key=f'-IND-{name}-', enable_events=True, font=('Helvetica', 12)) for name, label in INDICATORS.items()]
+
+# 체크된 보조지표 이름
+def selected_indicators(values):
+    return tuple(name for name in INDICATORS if values.get(f'-IND-{name}-'))
+
+# 종목 정보를 출력용 문자열로 변환
+def format_info_text(name, code, quote):
+    info_text = f"[{name}] ({code})\n"
+    for k, v in format_quote(quote).items():
+        info_text += f"{k} : {v}\n"
+    return info_text
+
+# 종목 데이터 불러오기 (종목 코드, 종목 정보, 시세)
+def load_stock_data(stock_name, period, with_info=True, refresh=True, quote=None, cancelled=None):
+    matched_name, stock_code = get_stock_code(stock_name)
+    # 일치하는 종목이 없을 때
+    if not stock_code:
+        return {'error' : "❌ 없는 주식입니다.", 'clear_chart' : True}
+
+    if with_info and quote is None:
+        # 인기 주식 창에서 미리 불러온 정보가 있으면 사용
+        quote = take_prefetched_quote(stock_code)
+    if with_info and quote is None:
+        check_cancelled(cancelled)
+        quote = run_shared(('quote', stock_code), get_quote, stock_code)
+        # 주식 정보 크롤링에 실패했을 때
+        if not quote:
+            return {'error' : "❌ 주식 정보 조회 실패", 'clear_chart' : False}
+
+    # 주기만 바꿀 때는 메모리의 일봉에서 바로 재구성
+    check_cancelled(cancelled)
+    df = get_period_table(stock_code, period, refresh=refresh)
+    # 시세 테이블 크롤링에 실패했을 때
+    if df.empty:
+        return {'error' : "❌ 시세 정보가 부족합니다.", 'clear_chart' : True}
+    if quote is not None:
+        quote.name = matched_name
+    return {'name' : matched_name, 'code' : stock_code, 'quote' : quote, 'df' : df}
+
+# 종목 화면에 필요한 데이터 불러오기 (종목 데이터 + 시세 차트)
+def load_stock_view(stock_name, period, with_info=True, indicators=(), cancelled=None):
+    # 정보 없이 부르는 경우는 주기 변경이므로 네트워크 요청 없이 처리
+    data = load_stock_data(stock_name, period, with_info, refresh=with_info, cancelled=cancelled)
+    if 'error' in data:
+        return data
+
+    # 시세 차트 그리기
+    check_cancelled(cancelled)
+    data['img'] = get_chart_image(data['code'], period, data['df'], indicators=indicators)
+    return data
+
+# 비교 표 항목
+COMPARE_COLUMNS = ['종목명', '종목코드', '현재가', '등락률', '기간수익률', 'PER', 'PBR', '배당수익률', '외국인소진율']
+# 한 번에 비교할 수 있는 최대 종목 수
+COMPARE_MAX = 8
+
+# 여러 종목을 동시에 불러와 수익률 비교 차트와 비교 표 만들기
+# (previous가 있으면 주기 변경이므로 이전 종목 정보를 재사용)
+def load_compare_view(stock_names, period, previous=None, indicators=(), cancelled=None):
+    quotes = {}
+    if previous:
+        quotes = {name : stock['quote'] for name, stock in zip(stock_names, previous) if 'error' not in stock}
+
+    def load(name):
+        return load_stock_data(name, period, refresh=name not in quotes, quote=quotes.get(name), cancelled=cancelled)
+
+    with ThreadPoolExecutor(max_workers=len(stock_names)) as executor:
+        stocks = list(map_in_context(executor, load, stock_names))
+    check_cancelled(cancelled)
+
+    valid = [stock for stock in stocks if 'error' not in stock]
+    rebased = rebase_returns({stock['name'] : stock['df'] for stock in valid})
+
+    rows = []
+    for name, stock in zip(stock_names, stocks):
+        if 'error' in stock:
+            rows.append([name, '', stock['error']] + [''] * (len(COMPARE_COLUMNS) - 3))
+            continue
+        info = format_quote(stock['quote'])
+        period_return = f"{rebased[stock['name']].iloc[-1]:+.2f}%" if stock['name'] in rebased else 'N/A'
+        row = {'종목명' : stock['name'], '종목코드' : stock['code'], '기간수익률' : period_return}
+        rows.append([row.get(column, info.get(column, 'N/A')) for column in COMPARE_COLUMNS])
+
+    # 수익률 비교 차트와 첫 번째 종목의 캔들차트를 서로 다른 차트 프로세스에서 동시에
+    check_cancelled(cancelled)
+    selected = next((i for i, stock in enumerate(stocks) if 'error' not in stock), None)
+    first = stocks[selected] if selected is not None else None
+    jobs = [
+        lambda : render_compare_chart(rebased) if not rebased.empty else None,
+        lambda : get_chart_image(first['code'], period, first['df'], indicators=indicators) if first else None
+    ]
+    with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+        overlay, chart = map_in_context(executor, lambda job : job(), jobs)
+    return {'stocks' : stocks, 'rows' : rows, 'overlay' : overlay, 'chart' : chart, 'selected' : selected}
+
+# 한국 표준시
+KST = datetime.timezone(datetime.timedelta(hours=9))
+# 넥스트레이드(NXT) 거래 시간 (평일 08:00 ~ 20:00)
+MARKET_OPEN = datetime.time(8, 0)
+MARKET_CLOSE = datetime.time(20, 0)
+# 장중 갱신 간격, 오류 시 최대 대기 시간 (초)
+POPULAR_REFRESH = 5
+POPULAR_REFRESH_MAX = 120
+# 인기 종목 갱신 결과를 창으로 보내는 이벤트
+POPULAR_UPDATE_EVENT = '-POPULAR-UPDATE-'
+
+# 장중인지 확인 (공휴일은 고려하지 않음)
+def market_is_open(now=None):
+    now = now or datetime.datetime.now(KST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+# 다음 장 시작 시각
+def next_market_open(now=None):
+    now = now or datetime.datetime.now(KST)
+    day = now.date() if now.time() < MARKET_OPEN else now.date() + datetime.timedelta(days=1)
+    while day.weekday() >= 5:
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, MARKET_OPEN, tzinfo=KST)
+
+# 다음 갱신까지 기다릴 시간 (장중에는 짧게, 오류가 이어지면 점점 길게, 장 마감 중에는 장 시작까지)
+def popular_refresh_delay(errors=0, now=None):
+    now = now or datetime.datetime.now(KST)
+    if errors:
+        return min(POPULAR_REFRESH * 2 ** errors, POPULAR_REFRESH_MAX)
+    if market_is_open(now):
+        return POPULAR_REFRESH
+    return (next_market_open(now) - now).total_seconds()
+
+# 인기 종목 실시간 갱신 (백그라운드 스레드에서 주기적으로 조회해 창으로 전달)
+class PopularPoller:
+    def __init__(self, window, limit=10):
+        self.window = window
+        self.limit = limit
+        self.live = True
+        self.closed = False
+        self.errors = 0
+        self._last_html = None
+        self._last_limit = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name='pystock-popular', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    # 바로 다시 조회
+    def refresh(self):
+        self._wake.set()
+
+    def set_limit(self, limit):
+        self.limit = limit
+        self.refresh()
+
+    # 자동 갱신 켜기/끄기 (끄면 refresh 요청이 있을 때만 조회)
+    def set_live(self, live):
+        self.live = live
+        self.refresh()
+
+    def close(self):
+        self.closed = True
+        self._wake.set()
+
+    def _loop(self):
+        while not self.closed:
+            self._wake.clear()
+            self._poll()
+            delay = popular_refresh_delay(self.errors) if self.live else None
+            self._wake.wait(delay)
+
+    def _poll(self):
+        limit = self.limit
+        rows, error = None, None
+        with traced('popular live') as trace:
+            try:
+                html = http_get(POPULAR_URL)
+                # 페이지가 그대로면 다시 파싱하지 않음
+                if html != self._last_html or limit != self._last_limit:
+                    with span('parse'):
+                        rows = parse_popular_quotes(html, limit)
+                    self._last_html, self._last_limit = html, limit
+                self.errors = 0
+            except Exception as e:
+                self.errors += 1
+                error = e
+        if self.closed:
+            return
+        delay = popular_refresh_delay(self.errors) if self.live else None
+        try:
+            self.window.write_event_value(POPULAR_UPDATE_EVENT, (rows, error, trace, delay, self.errors))
+        except Exception:
+            # 창이 이미 닫힌 경우
+            pass
+
+# 인기 종목 표에서 바뀐 칸만 갱신 (전체를 다시 그리지 않음)
+def update_popular_table(table, previous, current):
+    values = [list(format_quote(quote, POPULAR_COLUMNS).values()) for quote in current]
+    if len(previous) != len(current):
+        table.update(values=values)
+        return len(current)
+
+    tree = table.Widget
+    items = tree.get_children()
+    changes = diff_popular_rows(previous, current)
+    for index, cells, direction in changes:
+        item = items[index]
+        for column, value in cells.items():
+            tree.set(item, column, value)
+        tags = [tag for tag in tree.item(item, 'tags') if tag not in ('up', 'down')]
+        if direction:
+            tags.append(direction)
+        tree.item(item, tags=tags)
+    table.Values = values
+    return len(changes)
+
+# 미리 불러오기 스레드 수 (화면 작업보다 적게)
+PREFETCH_WORKERS = 2
+# 인기 주식 창에서 미리 불러올 종목 수 (표에 보이는 행 수)
+PREFETCH_MAX = 10
+# 미리 불러온 정보의 유효 시간 (초, 시세 갱신 주기와 같게)
+PREFETCH_TTL = PRICE_REFRESH_TTL
+
+_prefetch_executor = None
+_prefetched = {}
+_prefetch_lock = threading.Lock()
+_prefetch_stats = {'prefetched' : 0, 'hits' : 0, 'wasted' : 0, 'cancelled' : 0, 'failed' : 0}
+
+# 미리 불러오기용 스레드 풀 (화면 작업용과 따로)
+def get_prefetch_executor():
+    global _prefetch_executor
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix='pystock-prefetch')
+        return _prefetch_executor
+
+def count_prefetch(name, amount=1):
+    with _prefetch_lock:
+        _prefetch_stats[name] += amount
+
+# 미리 불러오기 통계 (적중률 = 사용된 수 / 미리 불러온 수, 만료된 정보는 먼저 정리해 낭비로 집계)
+def prefetch_stats():
+    purge_prefetched()
+    with _prefetch_lock:
+        stats = dict(_prefetch_stats)
+        stats['pending'] = len(_prefetched)
+    stats['hit_rate'] = stats['hits'] / stats['prefetched'] if stats['prefetched'] else 0.0
+    return stats
+
+def reset_prefetch():
+    with _prefetch_lock:
+        _prefetched.clear()
+        for name in _prefetch_stats:
+            _prefetch_stats[name] = 0
+
+# 유효 시간이 지난 미리 불러온 정보 정리 (사용되지 않은 것은 낭비로 집계)
+def purge_prefetched():
+    now = time.monotonic()
+    with _prefetch_lock:
+        for code in [code for code, (fetched_at, _) in _prefetched.items() if now - fetched_at >= PREFETCH_TTL]:
+            del _prefetched[code]
+            _prefetch_stats['wasted'] += 1
+
+def store_prefetched(code, quote):
+    purge_prefetched()
+    with _prefetch_lock:
+        if code not in _prefetched:
+            _prefetch_stats['prefetched'] += 1
+        _prefetched[code] = (time.monotonic(), quote)
+
+def is_prefetched(code):
+    purge_prefetched()
+    with _prefetch_lock:
+        return code in _prefetched
+
+# 미리 불러온 종목 정보 꺼내기 (없으면 None)
+def take_prefetched_quote(code):
+    purge_prefetched()
+    with _prefetch_lock:
+        entry = _prefetched.pop(code, None)
+        if entry is None:
+            return None
+        _prefetch_stats['hits'] += 1
+    trace = current_trace()
+    if trace:
+        trace.count('prefetch')
+    return entry[1]
+
+# 화면 작업이 없을 때까지 대기
+def wait_foreground_idle(cancelled):
+    while not _foreground_idle.wait(0.1):
+        check_cancelled(cancelled)
+    check_cancelled(cancelled)
+
+# 종목 하나를 미리 불러오기 (종목 코드, 정보, 일봉 시세, 차트 캐시를 채움)
+def prefetch_stock(stock_name, cancelled=None):
+    wait_foreground_idle(cancelled)
+    matched_name, stock_code = get_stock_code(stock_name)
+    if not stock_code or is_prefetched(stock_code):
+        return
+    wait_foreground_idle(cancelled)
+    quote = run_shared(('quote', stock_code), get_quote, stock_code)
+    if not quote:
+        return
+    wait_foreground_idle(cancelled)
+    df = get_period_table(stock_code, 'D')
+    if df.empty:
+        return
+    wait_foreground_idle(cancelled)
+    get_chart_image(stock_code, 'D', df)
+    store_prefetched(stock_code, quote)
+
+# 창 하나의 미리 불러오기 관리 (창이 닫히면 남은 작업 취소)
+class Prefetcher:
+    def __init__(self, name='prefetch'):
+        self.name = name
+        self.closed = False
+        # 종목명 -> (요청 시각, future)
+        self._futures = {}
+
+    # 아직 요청하지 않았거나 미리 불러온 정보가 만료된 종목만 미리 불러오기
+    def submit(self, stock_names):
+        if self.closed:
+            return
+        self.evict()
+        for stock_name in stock_names:
+            if stock_name not in self._futures:
+                self._futures[stock_name] = (time.monotonic(), get_prefetch_executor().submit(self._run, stock_name))
+
+    # 끝난 지 유효 시간이 지난 요청 정리 (다시 보이면 새로 불러오고, 쓰이지 않은 정보는 낭비로 집계)
+    def evict(self):
+        now = time.monotonic()
+        for stock_name in [name for name, (submitted_at, future) in self._futures.items()
+                           if future.done() and now - submitted_at >= PREFETCH_TTL]:
+            del self._futures[stock_name]
+        purge_prefetched()
+
+    def _run(self, stock_name):
+        cancelled = lambda : self.closed
+        if cancelled():
+            return
+        with traced(f'{self.name} {stock_name}'), background_requests(cancelled):
+            try:
+                prefetch_stock(stock_name, cancelled)
+            except TaskCancelled:
+                count_prefetch('cancelled')
+            except Exception as e:
+                count_prefetch('failed')
+                logger.debug("%s 미리 불러오기 실패 : %s", stock_name, e)
+
+    # 창을 닫을 때 남은 작업 취소 (진행 중인 작업은 다음 요청 전에 중단)
+    def close(self):
+        self.closed = True
+        for _, future in self._futures.values():
+            if future.cancel():
+                count_prefetch('cancelled')
+        logger.info("미리 불러오기 : %s", prefetch_stats())
+
+# 미리 불러오기 상태 문자열
+def format_prefetch_status():
+    stats = prefetch_stats()
+    return f"미리 불러오기 {stats['prefetched']}개 (적중 {stats['hits']}, 낭비 {stats['wasted']})"
+
+# 인기 주식 상태 표시줄 문자열
+def format_popular_status(error, trace, delay, errors=0):
+    clock = datetime.datetime.now(KST).strftime('%H:%M:%S')
+    if error:
+        retry = f" · {delay:.0f}초 후 재시도" if delay is not None else ''
+        return f"❌ 조회 실패 ({errors}회) : {error}{retry}"
+    if delay is None:
+        state = "⏸ 자동 갱신 꺼짐"
+    elif market_is_open():
+        state = f"🟢 장중 · {delay:.0f}초마다 갱신"
+    else:
+        state = f"🌙 장 마감 · {next_market_open().strftime('%m/%d %H:%M')} 재개"
+    return f"{state} · {clock} · {trace.summary()} · {format_prefetch_status()}"
 
 # 주식 검색 창
 def search_stock_window(preset_name=None):
@@ -270,38 +2650,29 @@ def search_stock_window(preset_name=None):
         [sg.Text('종목 이름을 입력하세요', font=('Helvetica', 16))],
         [sg.InputText(key='-STOCK-NAME-', font=('Helvetica', 16))],
         [sg.Button('일봉', key='-D-', font=('Helvetica', 16)), sg.Button('주봉', key='-W-', font=('Helvetica', 16)), sg.Button('월봉', key='-M-', font=('Helvetica', 16))],
+        indicator_checkboxes(),
         [sg.Button('검색', expand_x=True, font=('Helvetica', 16)), sg.Button('뒤로가기', expand_x=True, font=('Helvetica', 16))],
+        [sg.Text('', key='-STATUS-', font=('Helvetica', 12), expand_x=True)],
         [sg.Image(key='-CHART-')],
         [sg.Multiline(key='-INFO-', size=(70, 10), font=('Consolas', 16), disabled=True)]
     ]
 
     window = sg.Window('주식 검색', layout, modal=True, resizable=True, element_justification='c', finalize=True)
+    tasks = BackgroundTasks(window, 'search')
     chart_period = 'D'
-    pages_map = {'D' : 3, 'W' : 15, 'M' : 60}
+    indicators = ()
     last_stock_name = ''
 
+    # 종목 정보와 차트를 백그라운드에서 불러오기 (이전 요청은 취소)
+    def start_search(stock_name, with_info=True):
+        window['-STATUS-'].update("⏳ 불러오는 중...")
+        tasks.submit('stock', load_stock_view, stock_name, chart_period, with_info, indicators)
+
     # 인기 주식 창에서 매개변수로 종목 이름 들어온 경우
     if preset_name:
         window['-STOCK-NAME-'].update(preset_name)
         last_stock_name = preset_name
-        matched_name, stock_code = get_stock_code(preset_name)
-        if stock_code:
-            # 종목 정보, 시세 정보 가져오기
-            info = get_stock_info(stock_code)
-            df = get_price_table(stock_code, pages=pages_map[chart_period])
-            # 주봉, 월봉인 경우 재구성
-            if chart_period in ['W', 'M']:
-                df = resample_ohlcv(df, rule=chart_period)
-            # 시세 차트 그리기
-            plot_candle_chart(df)
-            with open('chart.png', 'rb') as f:
-                img = f.read()
-            info_text = f"[{matched_name}] ({stock_code})\n"
-            # 종목 정보 출력
-            for k, v in info.items():
-                info_text += f"{k} : {v}\n"
-            window['-INFO-'].update(info_text)
-            window['-CHART-'].update(data=img)
+        start_search(preset_name)
 
     while True:
         event, values = window.read()
@@ -309,26 +2680,37 @@ def search_stock_window(preset_name=None):
         if event in (sg.WIN_CLOSED, '뒤로가기'):
             break
 
+        # 백그라운드 작업 완료
+        if event == TASK_DONE_EVENT:
+            slot, generation, result, error, trace = values[event]
+            if not tasks.accept(slot, generation):
+                continue
+            # 단계별 소요 시간 표시
+            window['-STATUS-'].update(trace.summary())
+            if error:
+                window['-INFO-'].update(f"❌ 요청 실패 : {error}")
+                continue
+            if 'error' in result:
+                window['-INFO-'].update(result['error'])
+                if result['clear_chart']:
+                    window['-CHART-'].update(data=None)
+                continue
+            # 크롤링에 성공했을 때 (주기 변경 시에는 차트만 갱신)
+            if result['quote']:
+                window['-INFO-'].update(format_info_text(result['name'], result['code'], result['quote']))
+            window['-CHART-'].update(data=result['img'])
+
         # 사용자가 일봉/주봉/월봉 버튼 중 하나를 클릭했을 때
         if event in ['-D-', '-W-', '-M-']:
             chart_period = event.strip('-')
             if last_stock_name:
-                # 종목명으로 종목 코드 조회
-                matched_name, stock_code = get_stock_code(last_stock_name)
-                # 종목이 없는 경우
-                if not stock_code:
-                    window['-INFO-'].update("❌ 없는 주식입니다.")
-                    window['-CHART-'].update(data=None)
-                    continue
-                # 있는 경우 시세 정보, 주기 가져오기
-                df = get_price_table(stock_code, pages=pages_map[chart_period])
-                # 주봉, 월봉인 경우 재구성
-                if chart_period in ['W', 'M']:
-                    df = resample_ohlcv(df, rule=chart_period)
-                plot_candle_chart(df)
-                with open('chart.png', 'rb') as f:
-                    img = f.read()
-                window['-CHART-'].update(data=img)
+                start_search(last_stock_name, with_info=False)
+
+        # 보조지표 선택이 바뀌었을 때 (차트만 다시 그리기)
+        if event.startswith('-IND-'):
+            indicators = selected_indicators(values)
+            if last_stock_name:
+                start_search(last_stock_name, with_info=False)
 
         # 검색 버튼
         if event == '검색':
@@ -338,166 +2720,296 @@ def search_stock_window(preset_name=None):
                 continue
 
             last_stock_name = stock_name
-            matched_name, stock_code = get_stock_code(stock_name)
-            # 일치하는 종목이 없을 때
-            if not stock_code:
-                window['-INFO-'].update("❌ 없는 주식입니다.")
-                window['-CHART-'].update(data=None)
-                continue
-
-            info = get_stock_info(stock_code)
-            # 주식 정보 크롤링에 실패했을 때
-            if not info:
-                window['-INFO-'].update("❌ 주식 정보 조회 실패")
-                continue
-            
-            df = get_price_table(stock_code, pages=pages_map[chart_period])
-            # 시세 테이블 크롤링에 실패했을 때
-            if df.empty:
-                window['-INFO-'].update("❌ 시세 정보가 부족합니다.")
-                window['-CHART-'].update(data=None)
-                continue
-            
-            if chart_period in ['W', 'M']:
-                df = resample_ohlcv(df, rule=chart_period)
-            
-            plot_candle_chart(df)
-            # 시세 차트 그리기
-            with open('chart.png', 'rb') as f:
-                img = f.read()
-
-            # 크롤링에 성공했을 때
-            info_text = f"[{matched_name}] ({stock_code})\n"
-            # 종목 정보 출력
-            for k, v in info.items():
-                info_text += f"{k} : {v}\n"
-
-            window['-INFO-'].update(info_text)
-            window['-CHART-'].update(data=img)
+            start_search(stock_name)
 
+    tasks.close()
     window.close()
-    if os.path.exists('chart.png'):
-        os.remove('chart.png')
 
 # 주식 비교 창
 def compare_stock_window():
     layout = [
-        [sg.Text('종목1 :', font=('Helvetica', 16)), sg.InputText(key='-STOCK1-', font=('Helvetica', 16)), sg.Text('종목2 :', font=('Helvetica', 16)), sg.InputText(key='-STOCK2-', font=('Helvetica', 16))],
+        [sg.Text(f'종목들 (쉼표로 구분, 최대 {COMPARE_MAX}개) :', font=('Helvetica', 16)), sg.InputText(key='-STOCKS-', font=('Helvetica', 16), expand_x=True)],
         [sg.Button('일봉', key='-D-', font=('Helvetica', 16)), sg.Button('주봉', key='-W-', font=('Helvetica', 16)), sg.Button('월봉', key='-M-', font=('Helvetica', 16))],
+        indicator_checkboxes(),
         [sg.Button('검색', expand_x=True, font=('Helvetica', 16)), sg.Button('뒤로가기', expand_x=True, font=('Helvetica', 16))],
-        [sg.Column([[sg.Image(key='-CHART1-')]]), sg.Column([[sg.Image(key='-CHART2-')]])],
-        [sg.Multiline(key='-INFO1-', size=(70, 10), font=('Consolas', 16), disabled=True),
-         sg.Multiline(key='-INFO2-', size=(70, 10), font=('Consolas', 16), disabled=True)]
+        [sg.Text('', key='-STATUS-', font=('Helvetica', 12), expand_x=True)],
+        [sg.Column([[sg.Image(key='-OVERLAY-')]]), sg.Column([[sg.Image(key='-CHART-')]])],
+        # 비교 표 (종목 클릭 시 오른쪽에 해당 종목 캔들차트)
+        [sg.Table(values=[],
+                  headings=COMPARE_COLUMNS,
+                  key='-METRICS-',
+                  font=('Consolas', 14),
+                  auto_size_columns=False,
+                  col_widths=[16, 8, 12, 10, 10, 10, 10, 10, 12],
+                  justification='right',
+                  expand_x=True,
+                  num_rows=COMPARE_MAX,
+                  enable_events=True,
+                  alternating_row_color='#f0f0f0')]
     ]
-    window = sg.Window('주식 비교', layout, resizable=True, modal=True, element_justification='c')
+    window = sg.Window('주식 비교', layout, resizable=True, modal=True, element_justification='c', finalize=True)
+    tasks = BackgroundTasks(window, 'compare')
     chart_period = 'D'
-    pages_map = {'D' : 3, 'W' : 15, 'M' : 60}
-    stock_names = ['', '']
-
-    def update_stock(index):
-        name, code = get_stock_code(stock_names[index])
-        # 일치하는 종목이 없을 때
-        if not code:
-            window[f'-INFO{index+1}-'].update("❌ 없는 주식입니다.")
-            window[f'-CHART{index+1}-'].update(data=None)
-            return
-        
-        # 주식 정보 가져오기
-        info = get_stock_info(code)
-        # 주식 정보 크롤링에 실패했을 때
-        if not info:
-            window[f'-INFO{index+1}-'].update("❌ 주식 정보 조회 실패")
-            window[f'-CHART{index+1}-'].update(data=None)
-            return
+    indicators = ()
+    stock_names = []
+    stocks = []
+    selected = 0
 
-        # 시세 정보 가져오기
-        df = get_price_table(code, pages=pages_map[chart_period])
-        # 시세 정보 크롤링에 실패했을 때
-        if df.empty:
-            window[f'-INFO{index+1}-'].update("❌ 시세 정보가 부족합니다.")
-            window[f'-CHART{index+1}-'].update(data=None)
-            return
+    # 선택한 종목의 캔들차트 그리기
+    def show_candle(index):
+        nonlocal selected
+        if index < len(stocks) and 'error' not in stocks[index]:
+            selected = index
+            stock, period, names = stocks[index], chart_period, indicators
+            tasks.submit('chart', lambda cancelled : get_chart_image(stock['code'], period, stock['df'], indicators=names))
 
-        # 주봉, 일봉인 경우 재구성
-        if chart_period in ['W', 'M']:
-            df = resample_ohlcv(df, rule=chart_period)
-        filename = f'chart{index+1}.png'
-        # 시세 차트 그리기
-        plot_candle_chart(df, filename=filename)
-        with open(filename, 'rb') as f:
-            img = f.read()
-        info_text = f"[{name}] ({code})\n"
-        # 종목 정보 출력
-        for k, v in info.items():
-            info_text += f"{k} : {v}\n"
-        window[f'-INFO{index+1}-'].update(info_text)
-        window[f'-CHART{index+1}-'].update(data=img)
+    # 모든 종목을 동시에 불러오기 (주기 변경 시 이전 종목 정보 재사용)
+    def update_stocks(previous=None):
+        window['-STATUS-'].update("⏳ 불러오는 중...")
+        tasks.submit('compare', load_compare_view, stock_names, chart_period, previous, indicators)
 
     while True:
         event, values = window.read()
         # 뒤로가기 버튼
         if event in (sg.WIN_CLOSED, '뒤로가기'):
             break
+
+        # 백그라운드 작업 완료
+        if event == TASK_DONE_EVENT:
+            slot, generation, result, error, trace = values[event]
+            if not tasks.accept(slot, generation):
+                continue
+            # 단계별 소요 시간 표시
+            window['-STATUS-'].update(trace.summary() if not tasks.busy() else "⏳ 불러오는 중...")
+            if error:
+                window['-STATUS-'].update(f"❌ 요청 실패 : {error}")
+                continue
+            if slot == 'chart':
+                window['-CHART-'].update(data=result)
+                continue
+            stocks = result['stocks']
+            window['-METRICS-'].update(values=result['rows'])
+            window['-OVERLAY-'].update(data=result['overlay'])
+            # 첫 번째 종목의 캔들차트를 기본으로 표시 (비교 차트와 함께 그려짐)
+            window['-CHART-'].update(data=result['chart'])
+            selected = result['selected'] or 0
+            tasks.cancel('chart')
+
+        # 비교 표에서 종목 선택
+        if event == '-METRICS-' and values['-METRICS-']:
+            show_candle(values['-METRICS-'][0])
+
+        # 보조지표 선택이 바뀌었을 때 (선택한 종목의 캔들차트만 다시 그리기)
+        if event.startswith('-IND-'):
+            indicators = selected_indicators(values)
+            show_candle(selected)
+
         # 주기 변경 시
         if event in ['-D-', '-W-', '-M-']:
             chart_period = event.strip('-')
-            if all(stock_names):
-                update_stock(0)
-                update_stock(1)
+            if stock_names:
+                update_stocks(stocks if len(stocks) == len(stock_names) else None)
         # 검색 버튼 
         if event == '검색':
-            stock_names[0] = values['-STOCK1-'].strip()
-            stock_names[1] = values['-STOCK2-'].strip()
-            # 종목을 전부 입력하지 않았을 때
-            if not all(stock_names):
-                sg.popup("⚠️ 두 종목을 모두 입력하세요.")
+            stock_names = [name.strip() for name in values['-STOCKS-'].split(',') if name.strip()]
+            # 비교할 종목이 부족하거나 너무 많을 때
+            if len(stock_names) < 2 or len(stock_names) > COMPARE_MAX:
+                sg.popup(f"⚠️ 2개 이상 {COMPARE_MAX}개 이하의 종목을 입력하세요.")
+                stock_names = []
                 continue
-            update_stock(0)
-            update_stock(1)
+            update_stocks()
 
+    tasks.close()
     window.close()
-    for i in [1, 2]:
-        if os.path.exists(f'chart{i}.png'):
-            os.remove(f'chart{i}.png')
 
 # 인기 주식 창
-def popular_stock_window():
-    stock_data = get_popular_stock()
-    header = ['종목명', '현재가', '전일비', '등락률']
-    values = [[stock['종목명'], stock['현재가'], stock['전일비'], stock['등락률']] for stock in stock_data]
+def popular_stock_window(limit=10):
+    stock_data = []
 
     layout = [
         [sg.Text('인기 주식', font=('Helvetica', 16), justification='center', expand_x=True)],
+        [sg.Text('표시 개수', font=('Helvetica', 12)),
+         sg.Combo(POPULAR_LIMITS, default_value=limit, key='-LIMIT-', readonly=True, enable_events=True, font=('Helvetica', 12)),
+         sg.Checkbox('자동 갱신', default=True, key='-LIVE-', enable_events=True, font=('Helvetica', 12)),
+         sg.Button('새로고침', key='-REFRESH-', font=('Helvetica', 12))],
+        [sg.Text("⏳ 불러오는 중...", key='-STATUS-', font=('Helvetica', 12), expand_x=True)],
         # 인기 주식 표 그리기
-        [sg.Table(values=values,
-                  headings=header,
+        [sg.Table(values=[],
+                  headings=POPULAR_COLUMNS,
                   key='-TABLE-',
                   font=('Helvetica', 16),
                   auto_size_columns=False,
                   col_widths=[20, 12, 20, 10],
                   justification='left',
                   expand_x=True,
-                  num_rows=min(10, len(values)),
+                  num_rows=10,
                   enable_events=True,
                   alternating_row_color='#f0f0f0')],
         [sg.Button('뒤로가기', expand_x=True, font=('Helvetica', 16))]
     ]
 
-    window = sg.Window('인기 주식', layout, modal=True, resizable=True, element_justification='c')
+    window = sg.Window('인기 주식', layout, modal=True, resizable=True, element_justification='c', finalize=True)
+    # 직전 갱신에서 오른 종목은 빨간색, 내린 종목은 파란색
+    window['-TABLE-'].Widget.tag_configure('up', foreground='#d60000')
+    window['-TABLE-'].Widget.tag_configure('down', foreground='#0051c7')
+    poller = PopularPoller(window, limit)
+    poller.start()
+    # 표에 보이는 종목을 미리 불러와 클릭 시 바로 열리도록
+    prefetcher = Prefetcher('popular prefetch')
 
     while True:
         event, values_dict = window.read()
         if event in (sg.WIN_CLOSED, '뒤로가기'):
             break
+
+        # 표시 개수 변경, 자동 갱신 켜기/끄기, 새로고침
+        if event == '-LIMIT-':
+            poller.set_limit(int(values_dict['-LIMIT-']))
+        if event == '-LIVE-':
+            poller.set_live(values_dict['-LIVE-'])
+        if event == '-REFRESH-':
+            poller.refresh()
+
+        # 인기 주식 목록 갱신 (바뀐 칸만 반영)
+        if event == POPULAR_UPDATE_EVENT:
+            rows, error, trace, delay, errors = values_dict[event]
+            window['-STATUS-'].update(format_popular_status(error, trace, delay, errors))
+            if rows is None:
+                continue
+            update_popular_table(window['-TABLE-'], stock_data, rows)
+            stock_data = rows
+            prefetcher.submit([quote.name for quote in stock_data[:PREFETCH_MAX]])
+
         # 종목 클릭 시 해당 종목 세부 정보 확인
         if event == '-TABLE-' and values_dict['-TABLE-']:
             selected_idx = values_dict['-TABLE-'][0]
-            selected_name = stock_data[selected_idx]['종목명']
+            selected_name = stock_data[selected_idx].name
+            poller.close()
+            prefetcher.close()
             window.close()
             # 주식 검색 창으로 전환
             search_stock_window(selected_name)
             return
 
+    poller.close()
+    prefetcher.close()
+    window.close()
+
+
+# 스크리너 화면 표 항목
+SCREENER_COLUMNS = ['종목명', '종목코드', '현재가', 'PER', 'PBR', 'EPS', '배당수익률', '외국인소진율', '시가총액']
+# 정렬 기준으로 고를 수 있는 항목
+SCREENER_SORT_KEYS = ['시가총액', 'PER', 'PBR', 'EPS', '배당수익률', '외국인소진율', '현재가', '등락률']
+# 스크리너 표에 보여줄 최대 종목 수
+SCREENER_MAX_ROWS = 200
+# 수집 진행 상황을 창으로 보내는 이벤트
+SCREENER_PROGRESS_EVENT = '-SCREENER-PROGRESS-'
+
+# 스크리너 창
+def screener_window():
+    quotes = []
+
+    layout = [
+        [sg.Text('스크리너', font=('Helvetica', 16), justification='center', expand_x=True)],
+        [sg.Text('조건', font=('Helvetica', 12)),
+         sg.InputText('PER < 10 and 배당수익률 > 3%', key='-QUERY-', font=('Helvetica', 14), expand_x=True)],
+        [sg.Text('정렬', font=('Helvetica', 12)),
+         sg.Combo(SCREENER_SORT_KEYS, default_value='시가총액', key='-SORT-', readonly=True, font=('Helvetica', 12)),
+         sg.Checkbox('내림차순', default=True, key='-DESC-', font=('Helvetica', 12)),
+         sg.Button('검색', font=('Helvetica', 12)),
+         sg.Button('전체 종목 수집', key='-BUILD-', font=('Helvetica', 12)),
+         sg.Button('수집 중지', key='-STOP-', font=('Helvetica', 12), disabled=True)],
+        [sg.ProgressBar(100, orientation='h', key='-PROGRESS-', size=(40, 12), expand_x=True)],
+        [sg.Text('', key='-STATUS-', font=('Helvetica', 12), expand_x=True)],
+        [sg.Table(values=[],
+                  headings=SCREENER_COLUMNS,
+                  key='-TABLE-',
+                  font=('Helvetica', 14),
+                  auto_size_columns=False,
+                  col_widths=[16, 8, 12, 8, 8, 10, 10, 12, 16],
+                  justification='right',
+                  expand_x=True,
+                  num_rows=15,
+                  enable_events=True,
+                  alternating_row_color='#f0f0f0')],
+        [sg.Button('뒤로가기', expand_x=True, font=('Helvetica', 16))]
+    ]
+
+    window = sg.Window('스크리너', layout, modal=True, resizable=True, element_justification='c', finalize=True)
+    tasks = BackgroundTasks(window, 'screener')
+
+    # 스냅샷에서 조건 검색 (메모리에 올린 표에서 바로 계산)
+    def run_query(values):
+        nonlocal quotes
+        path = latest_screener_snapshot()
+        if path is None:
+            window['-STATUS-'].update("스냅샷이 없습니다. '전체 종목 수집'을 눌러 주세요.")
+            return
+        try:
+            started = time.perf_counter()
+            df = screen(values['-QUERY-'].strip() or None, values['-SORT-'], not values['-DESC-'], path=path)
+        except Exception as e:
+            window['-STATUS-'].update(f"❌ 조건식 오류 : {e}")
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        quotes = frame_to_quotes(df.head(SCREENER_MAX_ROWS))
+        window['-TABLE-'].update(values=[list(format_quote(quote, SCREENER_COLUMNS).values()) for quote in quotes])
+        snapshot_date = SCREENER_PATTERN.search(path).group(1)
+        window['-STATUS-'].update(f"{len(df):,}개 종목 ({snapshot_date} 기준, {elapsed:.0f}ms)")
+
+    # 진행 상황은 백그라운드 스레드에서 창으로 전달
+    def report(done, total, failed):
+        try:
+            window.write_event_value(SCREENER_PROGRESS_EVENT, (done, total, failed))
+        except Exception:
+            # 창이 이미 닫힌 경우
+            pass
+
+    event, values = window.read(timeout=0)
+    run_query(values)
+
+    while True:
+        event, values = window.read()
+        if event in (sg.WIN_CLOSED, '뒤로가기'):
+            break
+
+        if event == '검색':
+            run_query(values)
+
+        # 전체 종목 수집 (오늘 스냅샷이 있으면 남은 종목만)
+        if event == '-BUILD-':
+            window['-BUILD-'].update(disabled=True)
+            window['-STOP-'].update(disabled=False)
+            tasks.submit('build', build_screener_snapshot, SCREENER_WORKERS, None, report)
+
+        if event == '-STOP-':
+            tasks.cancel('build')
+            window['-BUILD-'].update(disabled=False)
+            window['-STOP-'].update(disabled=True)
+            window['-STATUS-'].update("⏸ 수집을 중지했습니다. 다시 누르면 이어서 수집합니다.")
+
+        if event == SCREENER_PROGRESS_EVENT and tasks.busy():
+            done, total, failed = values[event]
+            window['-PROGRESS-'].update(current_count=done, max=max(total, 1))
+            window['-STATUS-'].update(f"⏳ 수집 중... {done:,}/{total:,} (실패 {failed})")
+
+        # 수집 완료
+        if event == TASK_DONE_EVENT:
+            slot, generation, result, error, trace = values[event]
+            if not tasks.accept(slot, generation):
+                continue
+            window['-BUILD-'].update(disabled=False)
+            window['-STOP-'].update(disabled=True)
+            if error:
+                window['-STATUS-'].update(f"❌ 수집 실패 : {error}")
+                continue
+            run_query(values)
+
+        # 종목 클릭 시 해당 종목 세부 정보 확인
+        if event == '-TABLE-' and values['-TABLE-']:
+            search_stock_window(quotes[values['-TABLE-'][0]].name)
+
+    tasks.close()
     window.close()
 
 
@@ -510,10 +3022,14 @@ def main_menu():
     [sg.Button('📈 주식 검색', size=(20, 2), key='-SEARCH-', expand_x=True, font=('Helvetica', 16))],
     [sg.Button('⚖️ 주식 비교', size=(20, 2), key='-COMPARE-', expand_x=True, font=('Helvetica', 16))],
     [sg.Button('🔥 인기 주식', size=(20, 2), key='-POPULAR-', expand_x=True, font=('Helvetica', 16))],
+    [sg.Button('🔎 스크리너', size=(20, 2), key='-SCREENER-', expand_x=True, font=('Helvetica', 16))],
     [sg.Button('종료', size=(20, 1), expand_x=True, font=('Helvetica', 16))]
 ]
 
-    window = sg.Window('pystock', layout, resizable=True, element_justification='c')
+    window = sg.Window('pystock', layout, resizable=True, element_justification='c', finalize=True)
+    # 메뉴가 뜬 뒤 나머지 모듈과 차트 프로세스는 백그라운드에서
+    preload_modules()
+    start_chart_pool()
 
     while True:
         event, values = window.read()
@@ -529,8 +3045,221 @@ def main_menu():
         # 인기 주식 버튼
         elif event == '-POPULAR-':
             popular_stock_window()
+        # 스크리너 버튼
+        elif event == '-SCREENER-':
+            screener_window()
 
     window.close()
+    shutdown_chart_pool()
+
+# 일괄 조회 결과 항목
+BATCH_COLUMNS = ['입력', '종목명', '종목코드', '기준일', '종가', '거래일수'] + STOCK_INFO_KEYS + ['오류']
+
+# CSV 파일로 한 줄씩 저장
+class CsvSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = csv.DictWriter(self.file, fieldnames=columns)
+        self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# JSON Lines 파일로 한 줄씩 저장
+class JsonlSink:
+    def __init__(self, path, columns):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+# Parquet 파일로 저장 (일정 개수마다 row group 단위로 기록)
+class ParquetSink:
+    ROW_GROUP_SIZE = 50
+
+    def __init__(self, path, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.pa = pa
+        self.columns = columns
+        self.schema = pa.schema([(column, pa.string()) for column in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.rows = []
+
+    def write(self, record):
+        self.rows.append(record)
+        if len(self.rows) >= self.ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            data = {column : [None if row.get(column) is None else str(row[column]) for row in self.rows] for column in self.columns}
+            self.writer.write_table(self.pa.table(data, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+BATCH_SINKS = {'csv' : CsvSink, 'jsonl' : JsonlSink, 'parquet' : ParquetSink}
+
+# 관심 종목 파일 읽기 (한 줄에 종목명 또는 종목코드, #은 주석)
+def read_watchlist(path):
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            entry = line.split('#', 1)[0].strip()
+            if entry:
+                entries.append(entry)
+    return entries
+
+# 종목 하나의 정보와 시세 조회
+def snapshot_stock(entry, pages=3, prices_dir=None, charts_dir=None):
+    record = {'입력' : entry}
+    name, code = get_stock_code(entry)
+    if not code:
+        record['오류'] = '없는 주식'
+        return record
+    record['종목명'], record['종목코드'] = name, code
+
+    info = get_stock_info(code)
+    if not info:
+        record['오류'] = '주식 정보 조회 실패'
+        return record
+    record.update(info)
+
+    df = get_price_table(code, pages=pages)
+    if df.empty:
+        record['오류'] = '시세 정보 부족'
+        return record
+    record['기준일'] = df.index[-1].strftime('%Y-%m-%d')
+    record['종가'] = float(df['Close'].iloc[-1])
+    record['거래일수'] = len(df)
+
+    if prices_dir:
+        df.to_csv(os.path.join(prices_dir, f'{code}.csv'))
+    if charts_dir:
+        with open(os.path.join(charts_dir, f'{code}.png'), 'wb') as f:
+            f.write(get_chart_image(code, 'D', df))
+    return record
+
+# 관심 종목 일괄 조회 (python -m pystock batch watchlist.txt -o snapshot.csv)
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog='python -m pystock batch', description='관심 종목 정보와 시세를 일괄 조회합니다.')
+    parser.add_argument('watchlist', help='종목명 또는 종목코드가 한 줄에 하나씩 적힌 파일')
+    parser.add_argument('-o', '--output', default='snapshot.csv', help='결과 파일 (.csv, .jsonl, .parquet)')
+    parser.add_argument('--format', choices=sorted(BATCH_SINKS), help='결과 형식 (기본값 : 파일 확장자)')
+    parser.add_argument('--workers', type=int, default=FETCH_WORKERS, help='동시에 조회할 종목 수')
+    parser.add_argument('--rate', type=float, default=FETCH_RATE_LIMIT, help='호스트별 초당 최대 요청 수 (0이면 제한 없음)')
+    parser.add_argument('--pages', type=int, default=PERIOD_PAGES['D'], help='종목별 일별 시세 페이지 수')
+    parser.add_argument('--prices-dir', help='종목별 시세 CSV를 저장할 폴더')
+    parser.add_argument('--charts-dir', help='종목별 캔들차트 PNG를 저장할 폴더')
+    parser.add_argument('--trace-log', help='종목별 단계 소요 시간을 기록할 JSON Lines 파일')
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in BATCH_SINKS:
+        parser.error(f"지원하지 않는 결과 형식입니다 : {fmt}")
+    set_rate_limit(args.rate)
+    if args.trace_log:
+        set_trace_log(args.trace_log)
+    for folder in (args.prices_dir, args.charts_dir):
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    entries = read_watchlist(args.watchlist)
+    sink = BATCH_SINKS[fmt](args.output, BATCH_COLUMNS)
+    started = time.perf_counter()
+    done, failed = 0, []
+
+    def run(entry):
+        with traced(f'batch {entry}') as trace:
+            try:
+                record = snapshot_stock(entry, args.pages, args.prices_dir, args.charts_dir)
+            except Exception as e:
+                record = {'입력' : entry, '오류' : str(e)}
+        return record, trace
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = [executor.submit(run, entry) for entry in entries]
+            # 끝나는 순서대로 바로 기록
+            for future in as_completed(futures):
+                record, trace = future.result()
+                sink.write({column : record.get(column) for column in BATCH_COLUMNS})
+                done += 1
+                if record.get('오류'):
+                    failed.append(record)
+                    mark = '❌'
+                else:
+                    mark = '✅'
+                label = record.get('종목명') or record['입력']
+                print(f"[{done}/{len(entries)}] {mark} {label} ({trace.summary()}) {record.get('오류') or ''}".rstrip())
+    finally:
+        sink.close()
+
+    total = time.perf_counter() - started
+    print(f"\n완료 : {done}개, 성공 {done - len(failed)}개, 실패 {len(failed)}개")
+    print(f"소요 시간 : {total:.2f}s, 처리량 : {done / total if total else 0:.2f} 종목/s")
+    for record in failed:
+        print(f"  ❌ {record['입력']} : {record['오류']}")
+    return 1 if failed and len(failed) == done else 0
+
+# 스크리너 조회 (python -m pystock screen "PER < 10 and 배당수익률 > 3%")
+def screen_main(argv):
+    parser = argparse.ArgumentParser(prog='python -m pystock screen', description='전체 상장 종목의 투자 정보를 조건으로 검색합니다.')
+    parser.add_argument('query', nargs='?', help='조건식 (예: "PER < 10 and 배당수익률 > 3%%")')
+    parser.add_argument('--sort', help='정렬 기준 (예: 배당수익률, 시가총액)')
+    parser.add_argument('--desc', action='store_true', help='내림차순 정렬')
+    parser.add_argument('--limit', type=int, default=30, help='출력할 최대 종목 수 (0이면 전체)')
+    parser.add_argument('--update', action='store_true', help='오늘 스냅샷을 수집 (중단된 경우 이어서)')
+    parser.add_argument('--workers', type=int, default=SCREENER_WORKERS, help='동시에 조회할 종목 수')
+    parser.add_argument('--rate', type=float, default=FETCH_RATE_LIMIT, help='호스트별 초당 최대 요청 수 (0이면 제한 없음)')
+    parser.add_argument('-o', '--output', help='결과를 저장할 CSV 파일')
+    args = parser.parse_args(argv)
+
+    if args.update or latest_screener_snapshot() is None:
+        set_rate_limit(args.rate)
+        started = time.perf_counter()
+        last = [0]
+
+        def report(done, total, failed):
+            if done - last[0] >= 100 or done == total:
+                last[0] = done
+                print(f"[{done}/{total}] 수집 중... (실패 {failed})")
+
+        path = build_screener_snapshot(args.workers, progress=report)
+        print(f"스냅샷 저장 : {path} ({time.perf_counter() - started:.1f}s)\n")
+
+    try:
+        df = screen(args.query, args.sort, not args.desc, args.limit or None)
+    except Exception as e:
+        print(f"❌ 스크리너 조회 실패 : {e}")
+        return 1
+
+    if args.output:
+        df.to_csv(args.output, index=False, encoding='utf-8-sig')
+    rows = [format_quote(quote, SCREENER_COLUMNS) for quote in frame_to_quotes(df)]
+    print(pd.DataFrame(rows, columns=SCREENER_COLUMNS).to_string(index=False) if rows else "조건에 맞는 종목이 없습니다.")
+    return 0
+
+# 실행 진입점 (인자가 없으면 GUI 메인 메뉴)
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == 'batch':
+        return batch_main(argv[1:])
+    if argv and argv[0] == 'screen':
+        return screen_main(argv[1:])
+    main_menu()
+    return 0
 
 if __name__ == '__main__':
-    main_menu()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file